@@ -3,59 +3,44 @@
 Демонстрационный скрипт для показа работы TardeBot
 """
 
-import sys
-import os
 from loguru import logger
 
-# Добавляем путь к модулям проекта
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from tardebot.utils.config import Config
+from tardebot.data.stock_data import StockDataProvider
+from tardebot.models.price_predictor import PricePredictor
 
-from utils.config import Config
-from data.stock_data import StockDataProvider
-from models.price_predictor import PricePredictor
 
-
-def demo_data_fetching():
+def demo_data_fetching(provider):
     """Демонстрация получения данных"""
     logger.info("=== ДЕМОНСТРАЦИЯ ПОЛУЧЕНИЯ ДАННЫХ ===")
     
-    config = Config()
-    provider = StockDataProvider(config)
-    
     symbol = "AAPL"
     
-    # Получаем текущую цену
-    current_price = provider.get_current_price(symbol)
-    if current_price:
-        logger.info(f"Текущая цена {symbol}: ${current_price:.2f}")
-    
-    # Получаем предыдущую цену
-    previous_price = provider.get_previous_price(symbol)
-    if previous_price:
-        logger.info(f"Предыдущая цена {symbol}: ${previous_price:.2f}")
+    # Получаем текущую и предыдущую цену одним запросом
+    prices = provider.get_price_pair(symbol)
+    if prices:
+        current_price, previous_price = prices
+        logger.info("Текущая цена {}: ${:.2f}", symbol, current_price)
+        logger.info("Предыдущая цена {}: ${:.2f}", symbol, previous_price)
     
     # Получаем исторические данные
     historical_data = provider.get_historical_data(symbol, period="1mo")
     if historical_data is not None:
-        logger.info(f"Получено {len(historical_data)} записей исторических данных")
-        logger.info(f"Диапазон дат: {historical_data.index[0]} - {historical_data.index[-1]}")
+        logger.info("Получено {} записей исторических данных", len(historical_data))
+        logger.info("Диапазон дат: {} - {}", historical_data.index[0], historical_data.index[-1])
 
 
-def demo_model_training():
+def demo_model_training(provider, predictor):
     """Демонстрация обучения модели"""
     logger.info("=== ДЕМОНСТРАЦИЯ ОБУЧЕНИЯ МОДЕЛИ ===")
     
-    config = Config()
-    provider = StockDataProvider(config)
-    predictor = PricePredictor(config)
-    
     symbol = "AAPL"
     
     # Получаем данные для обучения
     training_data = provider.get_historical_data(symbol, period="6mo")
     
     if training_data is not None and not training_data.empty:
-        logger.info(f"Данные для обучения: {len(training_data)} записей")
+        logger.info("Данные для обучения: {} записей", len(training_data))
         
         # Обучаем модель
         success = predictor.train_model(training_data)
@@ -71,8 +56,8 @@ def demo_model_training():
                     current_price = provider.get_current_price(symbol)
                     if current_price:
                         change_percent = (predicted_price - current_price) / current_price * 100
-                        logger.info(f"Предсказанная цена: ${predicted_price:.2f}")
-                        logger.info(f"Ожидаемое изменение: {change_percent:.2f}%")
+                        logger.info("Предсказанная цена: ${:.2f}", predicted_price)
+                        logger.info("Ожидаемое изменение: {:.2f}%", change_percent)
         else:
             logger.error("Не удалось обучить модель")
     else:
@@ -84,18 +69,23 @@ def main():
     logger.info("Запуск демонстрации TardeBot")
     
     try:
+        # Компоненты создаются один раз и передаются в демонстрации
+        config = Config()
+        provider = StockDataProvider(config)
+        predictor = PricePredictor(config)
+        
         # Демонстрация получения данных
-        demo_data_fetching()
+        demo_data_fetching(provider)
         
         print("\n" + "="*50 + "\n")
         
         # Демонстрация обучения модели
-        demo_model_training()
+        demo_model_training(provider, predictor)
         
         logger.info("Демонстрация завершена")
         
     except Exception as e:
-        logger.error(f"Ошибка в демонстрации: {e}")
+        logger.error("Ошибка в демонстрации: {}", e)
 
 
 if __name__ == "__main__":
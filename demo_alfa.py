@@ -3,30 +3,24 @@
 Демонстрационный скрипт для работы с Альфа-Инвестициями
 """
 
-import sys
-import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 
-# Добавляем путь к модулям проекта
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from tardebot.utils.config import Config
+from tardebot.brokers.alfa_broker import AlfaBroker
 
-from utils.config import Config
-from brokers.alfa_broker import AlfaBroker
 
-
-def demo_alfa_connection():
+def demo_alfa_connection(broker):
     """Демонстрация подключения к Альфа-Инвестициям"""
     logger.info("=== ДЕМОНСТРАЦИЯ ПОДКЛЮЧЕНИЯ К АЛЬФА-ИНВЕСТИЦИЯМ ===")
     
-    config = Config()
-    broker = AlfaBroker(config)
-    
     # Проверяем подключение
     account_info = broker.get_account_info()
     if account_info:
-        logger.info(f"✅ Подключение успешно!")
-        logger.info(f"Аккаунт: {account_info.get('name', 'N/A')}")
-        logger.info(f"ID: {account_info.get('id', 'N/A')}")
+        logger.info("✅ Подключение успешно!")
+        logger.info("Аккаунт: {}", account_info.get('name', 'N/A'))
+        logger.info("ID: {}", account_info.get('id', 'N/A'))
     else:
         logger.error("❌ Не удалось подключиться к Альфа-Инвестициям")
         logger.error("Проверьте токен и ID аккаунта в .env файле")
@@ -35,95 +29,91 @@ def demo_alfa_connection():
     return True
 
 
-def demo_portfolio():
+def demo_portfolio(broker):
     """Демонстрация получения портфеля"""
     logger.info("=== ДЕМОНСТРАЦИЯ ПОРТФЕЛЯ ===")
     
-    config = Config()
-    broker = AlfaBroker(config)
-    
     # Получаем портфель
     portfolio = broker.get_portfolio()
     if portfolio:
         positions = portfolio.get('positions', [])
-        logger.info(f"Позиций в портфеле: {len(positions)}")
+        logger.info("Позиций в портфеле: {}", len(positions))
         
         for position in positions[:5]:  # Показываем первые 5 позиций
             ticker = position.get('ticker', 'N/A')
             balance = position.get('balance', 0)
             instrument_type = position.get('instrument_type', 'N/A')
             
-            logger.info(f"  {ticker}: {balance} ({instrument_type})")
+            logger.info("  {}: {} ({})", ticker, balance, instrument_type)
     
     # Получаем баланс
     balance = broker.get_balance()
     if balance:
-        logger.info(f"Денежный баланс: {balance:,.2f} RUB")
+        logger.info("Денежный баланс: {:,.2f} RUB", balance)
 
 
-def demo_market_data():
+async def demo_market_data(broker):
     """Демонстрация получения рыночных данных"""
     logger.info("=== ДЕМОНСТРАЦИЯ РЫНОЧНЫХ ДАННЫХ ===")
     
-    config = Config()
-    broker = AlfaBroker(config)
-    
     # Тестируем на популярных российских акциях
     symbols = ['SBER', 'GAZP', 'LKOH', 'YNDX', 'TCSG']
     
+    # Инструменты ищутся параллельно, все цены приходят одним запросом
+    try:
+        prices = await broker.get_current_prices_async(symbols)
+    finally:
+        await broker.aclose()
+
     logger.info("Текущие цены:")
     for symbol in symbols:
-        price = broker.get_current_price(symbol)
+        price = prices.get(symbol)
         if price:
-            logger.info(f"  {symbol}: {price:.2f} RUB")
+            logger.info("  {}: {:.2f} RUB", symbol, price)
         else:
-            logger.warning(f"  {symbol}: цена недоступна")
+            logger.warning("  {}: цена недоступна", symbol)
 
 
-def demo_historical_data():
+def demo_historical_data(config, broker):
     """Демонстрация получения исторических данных"""
     logger.info("=== ДЕМОНСТРАЦИЯ ИСТОРИЧЕСКИХ ДАННЫХ ===")
     
-    config = Config()
-    broker = AlfaBroker(config)
-    
     symbol = config.get('DEFAULT_SYMBOL', 'SBER')
     
-    # Получаем свечи за последние 30 дней
-    candles = broker.get_candles(symbol, interval='1day', days=30)
+    # Получаем свечи за последние 30 дней в колоночном виде
+    candles = broker.get_candles(symbol, interval='1day', days=30, as_array=True)
     
-    if candles:
-        logger.info(f"Получено {len(candles)} свечей для {symbol}")
+    if candles is not None and len(candles):
+        logger.info("Получено {} свечей для {}", len(candles), symbol)
+        
+        # Изменение за день считается сразу по всем свечам
+        df = broker.candles_to_df(candles)
         
         # Показываем последние 3 свечи
         logger.info("Последние 3 дня:")
-        for candle in candles[-3:]:
-            date = candle.get('time', 'N/A')[:10]  # Только дата
-            open_price = float(candle.get('open', 0))
-            close_price = float(candle.get('close', 0))
-            volume = int(candle.get('volume', 0))
-            
-            change = ((close_price - open_price) / open_price * 100) if open_price > 0 else 0
+        for candle in df.tail(3).itertuples():
+            date = candle.time.strftime('%Y-%m-%d')
             
-            logger.info(f"  {date}: {open_price:.2f} → {close_price:.2f} "
-                       f"({change:+.2f}%), объем: {volume:,}")
+            logger.info("  {}: {:.2f} → {:.2f} ({:+.2f}%), объем: {:,}",
+                        date, candle.open, candle.close, candle.pct_change, int(candle.volume))
     else:
-        logger.warning(f"Не удалось получить исторические данные для {symbol}")
+        logger.warning("Не удалось получить исторические данные для {}", symbol)
 
 
-def demo_search_instruments():
+def demo_search_instruments(broker):
     """Демонстрация поиска инструментов"""
     logger.info("=== ДЕМОНСТРАЦИЯ ПОИСКА ИНСТРУМЕНТОВ ===")
     
-    config = Config()
-    broker = AlfaBroker(config)
-    
     # Поиск по разным запросам
     queries = ['Сбербанк', 'Газпром', 'Яндекс']
     
+    # Запросы независимы, поэтому выполняем их параллельно
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = dict(zip(queries, executor.map(broker.search_instrument, queries)))
+    
     for query in queries:
-        logger.info(f"Поиск: '{query}'")
-        instruments = broker.search_instrument(query)
+        logger.info("Поиск: '{}'", query)
+        instruments = results[query]
         
         if instruments:
             for instrument in instruments[:3]:  # Показываем первые 3 результата
@@ -131,9 +121,9 @@ def demo_search_instruments():
                 ticker = instrument.get('ticker', 'N/A')
                 figi = instrument.get('figi', 'N/A')
                 
-                logger.info(f"  {ticker} - {name} (FIGI: {figi})")
+                logger.info("  {} - {} (FIGI: {})", ticker, name, figi)
         else:
-            logger.warning(f"  Ничего не найдено для '{query}'")
+            logger.warning("  Ничего не найдено для '{}'", query)
         
         print()  # Пустая строка для разделения
 
@@ -143,34 +133,39 @@ def main():
     logger.info("Запуск демонстрации Альфа-Инвестиций")
     
     try:
+        # Один брокер на все демонстрации: кэш инструментов и сессия
+        # переиспользуются между вызовами
+        config = Config()
+        broker = AlfaBroker(config)
+        
         # Проверяем подключение
-        if not demo_alfa_connection():
+        if not demo_alfa_connection(broker):
             return
         
         print("\n" + "="*60 + "\n")
         
         # Демонстрация портфеля
-        demo_portfolio()
+        demo_portfolio(broker)
         
         print("\n" + "="*60 + "\n")
         
         # Демонстрация рыночных данных
-        demo_market_data()
+        asyncio.run(demo_market_data(broker))
         
         print("\n" + "="*60 + "\n")
         
         # Демонстрация исторических данных
-        demo_historical_data()
+        demo_historical_data(config, broker)
         
         print("\n" + "="*60 + "\n")
         
         # Демонстрация поиска инструментов
-        demo_search_instruments()
+        demo_search_instruments(broker)
         
         logger.info("Демонстрация завершена успешно!")
         
     except Exception as e:
-        logger.error(f"Ошибка в демонстрации: {e}")
+        logger.error("Ошибка в демонстрации: {}", e)
         logger.error("Убедитесь, что:")
         logger.error("1. Создан файл .env с правильными токенами")
         logger.error("2. Токен Альфа-Инвестиций действителен")
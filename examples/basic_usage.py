@@ -3,15 +3,9 @@
 Примеры базового использования TardeBot
 """
 
-import sys
-import os
-
-# Добавляем путь к модулям проекта
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
-
-from utils.config import Config
-from data.stock_data import StockDataProvider
-from models.price_predictor import PricePredictor
+from tardebot.utils.config import Config
+from tardebot.data.stock_data import StockDataProvider
+from tardebot.models.price_predictor import PricePredictor
 from loguru import logger
 
 
@@ -25,17 +19,17 @@ def example_get_stock_data():
     # Получаем данные по Apple
     symbol = "AAPL"
     
-    current_price = provider.get_current_price(symbol)
-    previous_price = provider.get_previous_price(symbol)
+    prices = provider.get_price_pair(symbol)
     
-    if current_price and previous_price:
+    if prices:
+        current_price, previous_price = prices
         change = current_price - previous_price
         change_percent = (change / previous_price) * 100
         
-        logger.info(f"Символ: {symbol}")
-        logger.info(f"Текущая цена: ${current_price:.2f}")
-        logger.info(f"Предыдущая цена: ${previous_price:.2f}")
-        logger.info(f"Изменение: ${change:.2f} ({change_percent:+.2f}%)")
+        logger.info("Символ: {}", symbol)
+        logger.info("Текущая цена: ${:.2f}", current_price)
+        logger.info("Предыдущая цена: ${:.2f}", previous_price)
+        logger.info("Изменение: ${:.2f} ({:+.2f}%)", change, change_percent)
 
 
 def example_train_and_predict():
@@ -52,7 +46,7 @@ def example_train_and_predict():
     training_data = provider.get_historical_data(symbol, period="1y")
     
     if training_data is not None and len(training_data) > 100:
-        logger.info(f"Обучение модели на {len(training_data)} записях")
+        logger.info("Обучение модели на {} записях", len(training_data))
         
         # Обучаем модель
         if predictor.train_model(training_data):
@@ -68,9 +62,9 @@ def example_train_and_predict():
                 if predicted_price and current_price:
                     expected_return = (predicted_price - current_price) / current_price * 100
                     
-                    logger.info(f"Текущая цена {symbol}: ${current_price:.2f}")
-                    logger.info(f"Предсказанная цена: ${predicted_price:.2f}")
-                    logger.info(f"Ожидаемая доходность: {expected_return:+.2f}%")
+                    logger.info("Текущая цена {}: ${:.2f}", symbol, current_price)
+                    logger.info("Предсказанная цена: ${:.2f}", predicted_price)
+                    logger.info("Ожидаемая доходность: {:+.2f}%", expected_return)
                     
                     # Торговая рекомендация
                     if expected_return > 2:
@@ -94,11 +88,14 @@ def example_multiple_stocks():
     
     symbols = ["AAPL", "GOOGL", "MSFT", "TSLA", "AMZN"]
     
+    # Все цены загружаются одним пакетным запросом
+    prices = provider.get_current_prices(symbols)
+    
     logger.info("Текущие цены:")
     for symbol in symbols:
-        current_price = provider.get_current_price(symbol)
+        current_price = prices.get(symbol)
         if current_price:
-            logger.info(f"{symbol}: ${current_price:.2f}")
+            logger.info("{}: ${:.2f}", symbol, current_price)
 
 
 if __name__ == "__main__":
@@ -116,4 +113,4 @@ if __name__ == "__main__":
         logger.info("Все примеры выполнены")
         
     except Exception as e:
-        logger.error(f"Ошибка в примерах: {e}")
\ No newline at end of file
+        logger.error("Ошибка в примерах: {}", e)
\ No newline at end of file
@@ -2,12 +2,81 @@
 Модуль для работы с API Альфа-Инвестиций
 """
 
+import os
+import asyncio
+import httpx
 import requests
 import json
 import time
-from typing import Dict, List, Optional, Any
+import threading
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional, Any, Union, TYPE_CHECKING
 from loguru import logger
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+# Время (в секундах), в течение которого не найденный тикер не ищется повторно
+MISSING_INSTRUMENT_TTL = 300
+
+# Локальная таблица тикеров (ticker -> FIGI и метаданные) для популярных акций
+INSTRUMENTS_FILE = os.path.join(os.path.dirname(__file__), 'instruments.json')
+
+# Возраст (в секундах), после которого предзагруженный инструмент обновляется в фоне
+INSTRUMENTS_REFRESH_INTERVAL = 24 * 60 * 60
+
+# Параметры повторов запроса (общие для синхронного и асинхронного клиента)
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Максимальная пауза (в секундах) между повторами запроса
+MAX_RETRY_WAIT = 30
+
+# Таймауты (подключение, чтение) синхронных запросов, в секундах
+REQUEST_TIMEOUT = (3, 10)
+
+# Колоночное представление свечей (структурированный массив NumPy)
+CANDLE_DTYPE = [
+    ('time', 'datetime64[s]'),
+    ('open', 'f4'),
+    ('high', 'f4'),
+    ('low', 'f4'),
+    ('close', 'f4'),
+    ('volume', 'i8'),
+]
+
+# Ожидаемое число свечей в сутки для интервала (для выделения памяти заранее)
+CANDLES_PER_DAY = {
+    '1min': 24 * 60,
+    '5min': 24 * 12,
+    '15min': 24 * 4,
+    'hour': 24,
+    '1day': 1,
+}
+
+
+class _CappedRetry(Retry):
+    """Retry, который учитывает Retry-After, но не ждет дольше MAX_RETRY_WAIT"""
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_WAIT)
+
+
+def _retry_wait(response, attempt: int) -> float:
+    """Пауза перед повтором: Retry-After сервера или экспоненциальная, не дольше MAX_RETRY_WAIT"""
+    retry_after = response.headers.get('Retry-After')
+    wait = float(retry_after) if retry_after and retry_after.isdigit() \
+        else RETRY_BACKOFF_FACTOR * (2 ** attempt)
+    return min(wait, MAX_RETRY_WAIT)
 
 
 class AlfaBroker:
@@ -27,36 +96,150 @@ class AlfaBroker:
             'Accept': 'application/json'
         }
         
+        # Постоянная сессия: переиспользует TCP/TLS соединения между запросами
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            # Ограниченное число повторов с экспоненциальной паузой;
+            # при 429 пауза берется из заголовка Retry-After
+            max_retries=_CappedRetry(
+                total=RETRY_TOTAL,
+                backoff_factor=RETRY_BACKOFF_FACTOR,
+                status_forcelist=list(RETRY_STATUSES),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
+        
+        # Таблица методов: HTTP метод -> (функция сессии, имя аргумента для данных)
+        self._verbs = {
+            'GET': (self.session.get, 'params'),
+            'POST': (self.session.post, 'json'),
+        }
+        
+        # Асинхронный HTTP/2 клиент создается при первом обращении
+        self._aclient = None
+        
         # Кэш для инструментов
         self.instruments_cache = {}
+        self._missing_instruments = {}  # {ticker: время неудачного поиска}
+        self._preloaded_at = {}  # {ticker: время загрузки из локальной таблицы}
+        self._load_instruments()
         
         logger.info("Альфа-Брокер инициализирован")
     
+    def _load_instruments(self) -> None:
+        """Предзагрузка локальной таблицы инструментов в кэш"""
+        try:
+            with open(INSTRUMENTS_FILE, encoding='utf-8') as f:
+                instruments = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Не удалось загрузить таблицу инструментов: {}", e)
+            return
+        
+        loaded_at = time.time()
+        for ticker, instrument in instruments.items():
+            self.instruments_cache[ticker] = instrument
+            self._preloaded_at[ticker] = loaded_at
+        
+        logger.info("Предзагружено инструментов: {}", len(instruments))
+    
+    def _refresh_instrument(self, ticker: str) -> None:
+        """Обновление предзагруженного инструмента через поиск"""
+        instruments = self.search_instrument(ticker)
+        
+        for instrument in instruments or []:
+            if instrument.get('ticker') == ticker:
+                self.instruments_cache[ticker] = instrument
+                break
+    
     def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Optional[Dict]:
         """Выполнение HTTP запроса к API"""
-        url = f"{self.base_url}{endpoint}"
+        verb = self._verbs.get(method)
+        if verb is None:
+            logger.error("Неподдерживаемый HTTP метод: {}", method)
+            return None
+        
+        send, data_arg = verb
         
         try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=self.headers, params=data)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=self.headers, json=data)
+            for attempt in range(RETRY_TOTAL + 1):
+                response = send(self.base_url + endpoint, timeout=REQUEST_TIMEOUT, **{data_arg: data})
+                
+                # GET при 429/5xx повторяет HTTPAdapter. POST он не повторяет, но
+                # 429 означает, что сервер запрос не обработал: повтор безопасен
+                if response.status_code != 429 or method == 'GET' or attempt == RETRY_TOTAL:
+                    break
+                
+                time.sleep(_retry_wait(response, attempt))
+            
+            if response.status_code == 200:
+                return orjson.loads(response.content)
+            elif response.status_code == 429:
+                logger.warning("Превышен лимит запросов, повторы исчерпаны")
+                return None
             else:
-                logger.error(f"Неподдерживаемый HTTP метод: {method}")
+                logger.error("Ошибка API: {} - {}", response.status_code, response.text)
                 return None
+                
+        except Exception as e:
+            logger.error("Ошибка запроса к API: {}", e)
+            return None
+    
+    @property
+    def aclient(self) -> httpx.AsyncClient:
+        """Асинхронный HTTP/2 клиент: мультиплексирует запросы в одном соединении"""
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=20),
+                timeout=httpx.Timeout(10, connect=3)
+            )
+        return self._aclient
+    
+    async def aclose(self) -> None:
+        """Закрытие асинхронного клиента (нужно перед завершением event loop)"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+    
+    async def _amake_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Optional[Dict]:
+        """Асинхронное выполнение HTTP запроса к API"""
+        try:
+            for attempt in range(RETRY_TOTAL + 1):
+                if method.upper() == 'GET':
+                    response = await self.aclient.get(endpoint, params=data)
+                elif method.upper() == 'POST':
+                    response = await self.aclient.post(endpoint, json=data)
+                else:
+                    logger.error("Неподдерживаемый HTTP метод: {}", method)
+                    return None
+                
+                # Как и HTTPAdapter, при 5xx повторяем только идемпотентные GET;
+                # 429 (запрос не обработан) повторяем для любого метода
+                retryable = response.status_code == 429 or (
+                    response.status_code in RETRY_STATUSES and method.upper() == 'GET')
+                if not retryable or attempt == RETRY_TOTAL:
+                    break
+                
+                await asyncio.sleep(_retry_wait(response, attempt))
             
             if response.status_code == 200:
-                return response.json()
+                return orjson.loads(response.content)
             elif response.status_code == 429:
-                logger.warning("Превышен лимит запросов, ожидание...")
-                time.sleep(1)
-                return self._make_request(method, endpoint, data)
+                logger.warning("Превышен лимит запросов, повторы исчерпаны")
+                return None
             else:
-                logger.error(f"Ошибка API: {response.status_code} - {response.text}")
+                logger.error("Ошибка API: {} - {}", response.status_code, response.text)
                 return None
                 
         except Exception as e:
-            logger.error(f"Ошибка запроса к API: {e}")
+            logger.error("Ошибка запроса к API: {}", e)
             return None
     
     def get_account_info(self) -> Optional[Dict]:
@@ -66,34 +249,57 @@ class AlfaBroker:
         response = self._make_request('GET', f'/accounts/{self.account_id}')
         
         if response:
-            logger.info(f"Информация о счете получена: {response.get('name', 'N/A')}")
+            logger.info("Информация о счете получена: {}", response.get('name', 'N/A'))
             return response
         
         return None
     
     def get_portfolio(self) -> Optional[Dict]:
         """Получение портфеля"""
-        logger.info("Получение портфеля...")
+        logger.debug("Получение портфеля...")
         
         response = self._make_request('GET', f'/accounts/{self.account_id}/portfolio')
         
         if response:
             positions = response.get('positions', [])
-            logger.info(f"Портфель получен: {len(positions)} позиций")
+            logger.debug("Портфель получен: {} позиций", len(positions))
             return response
         
         return None
     
-    def get_balance(self) -> Optional[float]:
-        """Получение баланса счета"""
-        portfolio = self.get_portfolio()
+    async def get_portfolio_async(self) -> Optional[Dict]:
+        """Асинхронное получение портфеля"""
+        response = await self._amake_request('GET', f'/accounts/{self.account_id}/portfolio')
+        
+        if response:
+            logger.debug("Портфель получен: {} позиций", len(response.get('positions', [])))
+            return response
+        
+        return None
+    
+    def get_balance(self, portfolio: Optional[Dict] = None) -> Optional[float]:
+        """Получение баланса счета (по уже полученному портфелю, если он передан)"""
+        if portfolio is None:
+            portfolio = self.get_portfolio()
+        
+        return self._parse_balance(portfolio)
+    
+    async def get_balance_async(self, portfolio: Optional[Dict] = None) -> Optional[float]:
+        """Асинхронное получение баланса счета"""
+        if portfolio is None:
+            portfolio = await self.get_portfolio_async()
         
+        return self._parse_balance(portfolio)
+    
+    @staticmethod
+    def _parse_balance(portfolio: Optional[Dict]) -> Optional[float]:
+        """Рублевый баланс из портфеля"""
         if portfolio:
             # Ищем рублевые позиции
             for position in portfolio.get('positions', []):
                 if position.get('instrument_type') == 'currency' and position.get('ticker') == 'RUB':
                     balance = float(position.get('balance', 0))
-                    logger.info(f"Баланс счета: {balance} RUB")
+                    logger.debug("Баланс счета: {} RUB", balance)
                     return balance
         
         logger.warning("Не удалось получить баланс")
@@ -101,60 +307,192 @@ class AlfaBroker:
     
     def search_instrument(self, query: str) -> Optional[List[Dict]]:
         """Поиск финансового инструмента"""
-        logger.info(f"Поиск инструмента: {query}")
+        logger.info("Поиск инструмента: {}", query)
         
         response = self._make_request('GET', '/instruments/search', {'query': query})
         
         if response:
             instruments = response.get('instruments', [])
-            logger.info(f"Найдено инструментов: {len(instruments)}")
+            logger.info("Найдено инструментов: {}", len(instruments))
+            self._remember_instruments(instruments)
+            return instruments
+        
+        return None
+    
+    async def search_instrument_async(self, query: str) -> Optional[List[Dict]]:
+        """Асинхронный поиск финансового инструмента"""
+        logger.info("Поиск инструмента: {}", query)
+        
+        response = await self._amake_request('GET', '/instruments/search', {'query': query})
+        
+        if response:
+            instruments = response.get('instruments', [])
+            logger.info("Найдено инструментов: {}", len(instruments))
+            self._remember_instruments(instruments)
             return instruments
         
         return None
     
+    def _remember_instruments(self, instruments: List[Dict]) -> None:
+        """Кэширование всех найденных инструментов, а не только искомого"""
+        for instrument in instruments:
+            ticker = instrument.get('ticker')
+            if ticker:
+                self.instruments_cache.setdefault(ticker, instrument)
+    
     def get_instrument_by_ticker(self, ticker: str) -> Optional[Dict]:
         """Получение инструмента по тикеру"""
         if ticker in self.instruments_cache:
+            preloaded_at = self._preloaded_at.get(ticker)
+            if preloaded_at is not None and time.time() - preloaded_at > INSTRUMENTS_REFRESH_INTERVAL:
+                # Устаревшую запись отдаем сразу, а обновляем в фоне
+                self._preloaded_at[ticker] = time.time()
+                threading.Thread(target=self._refresh_instrument, args=(ticker,), daemon=True).start()
+            
             return self.instruments_cache[ticker]
         
+        if self._is_recent_miss(ticker):
+            return None
+        
         instruments = self.search_instrument(ticker)
+        return self._resolve_searched(ticker, instruments)
+    
+    async def get_instrument_by_ticker_async(self, ticker: str) -> Optional[Dict]:
+        """Асинхронное получение инструмента по тикеру"""
+        if ticker in self.instruments_cache or self._is_recent_miss(ticker):
+            # Ответ из кэша, сетевой запрос не нужен
+            return self.get_instrument_by_ticker(ticker)
+        
+        instruments = await self.search_instrument_async(ticker)
+        return self._resolve_searched(ticker, instruments)
+    
+    def _is_recent_miss(self, ticker: str) -> bool:
+        """Искали ли тикер недавно и не нашли"""
+        missed_at = self._missing_instruments.get(ticker)
+        return missed_at is not None and time.time() - missed_at < MISSING_INSTRUMENT_TTL
+    
+    def _resolve_searched(self, ticker: str, instruments: Optional[List[Dict]]) -> Optional[Dict]:
+        """Выбор инструмента по тикеру после поиска"""
+        # Поиск уже заполнил кэш найденными инструментами
+        instrument = self.instruments_cache.get(ticker)
+        if instrument:
+            self._missing_instruments.pop(ticker, None)
+            return instrument
+        
+        # Запоминаем промах, только если поиск действительно выполнился
+        if instruments is not None:
+            self._missing_instruments[ticker] = time.time()
+        
+        logger.warning("Инструмент {} не найден", ticker)
+        return None
+    
+    def get_current_price(self, ticker: str, figi: Optional[str] = None) -> Optional[float]:
+        """
+        Получение текущей цены инструмента
         
-        if instruments:
-            for instrument in instruments:
-                if instrument.get('ticker') == ticker:
-                    self.instruments_cache[ticker] = instrument
-                    return instrument
+        Если FIGI уже известен вызывающему коду, поиск инструмента пропускается.
+        """
+        figi = figi or self._figi(ticker)
+        if not figi:
+            return None
         
-        logger.warning(f"Инструмент {ticker} не найден")
-        return None
+        response = self._make_request('GET', f'/market-data/last-prices', {'figis': [figi]})
+        return self._parse_last_price(ticker, response)
     
-    def get_current_price(self, ticker: str) -> Optional[float]:
-        """Получение текущей цены инструмента"""
-        instrument = self.get_instrument_by_ticker(ticker)
+    async def get_current_price_async(self, ticker: str, figi: Optional[str] = None) -> Optional[float]:
+        """Асинхронное получение текущей цены инструмента"""
+        if not figi:
+            instrument = await self.get_instrument_by_ticker_async(ticker)
+            figi = self._instrument_figi(ticker, instrument)
+            if not figi:
+                return None
         
+        response = await self._amake_request('GET', '/market-data/last-prices', {'figis': [figi]})
+        return self._parse_last_price(ticker, response)
+    
+    def _figi(self, ticker: str) -> Optional[str]:
+        """FIGI инструмента по тикеру (None, если инструмент не найден)"""
+        return self._instrument_figi(ticker, self.get_instrument_by_ticker(ticker))
+    
+    @staticmethod
+    def _instrument_figi(ticker: str, instrument: Optional[Dict]) -> Optional[str]:
+        """FIGI из записи инструмента"""
         if not instrument:
             return None
         
         figi = instrument.get('figi')
         if not figi:
-            logger.error(f"FIGI не найден для {ticker}")
-            return None
-        
-        response = self._make_request('GET', f'/market-data/last-prices', {'figis': [figi]})
-        
+            logger.error("FIGI не найден для {}", ticker)
+        return figi
+    
+    def _parse_last_price(self, ticker: str, response: Optional[Dict]) -> Optional[float]:
+        """Извлечение цены из ответа /market-data/last-prices"""
         if response:
             last_prices = response.get('last_prices', [])
             if last_prices:
                 price_data = last_prices[0]
                 price = float(price_data.get('price', 0))
-                logger.info(f"Текущая цена {ticker}: {price}")
+                logger.debug("Текущая цена {}: {}", ticker, price)
                 return price
         
-        logger.warning(f"Не удалось получить цену для {ticker}")
+        logger.warning("Не удалось получить цену для {}", ticker)
         return None
-    
-    def get_candles(self, ticker: str, interval: str = '1day', days: int = 30) -> Optional[List[Dict]]:
-        """Получение свечей (исторических данных)"""
+
+    def get_current_prices(self, tickers: List[str]) -> Dict[str, float]:
+        """Получение текущих цен нескольких инструментов одним запросом"""
+        instruments = [self.get_instrument_by_ticker(ticker) for ticker in tickers]
+        figi_to_ticker = self._figi_map(tickers, instruments)
+
+        if not figi_to_ticker:
+            return {}
+
+        response = self._make_request('GET', '/market-data/last-prices', {'figis': list(figi_to_ticker)})
+        return self._parse_last_prices(figi_to_ticker, response, len(tickers))
+
+    async def get_current_prices_async(self, tickers: List[str]) -> Dict[str, float]:
+        """Асинхронное получение текущих цен: поиск инструментов идет параллельно"""
+        instruments = await asyncio.gather(
+            *(self.get_instrument_by_ticker_async(ticker) for ticker in tickers)
+        )
+        figi_to_ticker = self._figi_map(tickers, instruments)
+
+        if not figi_to_ticker:
+            return {}
+
+        response = await self._amake_request('GET', '/market-data/last-prices', {'figis': list(figi_to_ticker)})
+        return self._parse_last_prices(figi_to_ticker, response, len(tickers))
+
+    @staticmethod
+    def _figi_map(tickers: List[str], instruments: List[Optional[Dict]]) -> Dict[str, str]:
+        """Обратное отображение {figi: ticker} для найденных инструментов"""
+        figi_to_ticker = {}
+        for ticker, instrument in zip(tickers, instruments):
+            if instrument and instrument.get('figi'):
+                figi_to_ticker[instrument['figi']] = ticker
+        return figi_to_ticker
+
+    def _parse_last_prices(self, figi_to_ticker: Dict[str, str], response: Optional[Dict],
+                           requested: int) -> Dict[str, float]:
+        """Извлечение цен нескольких инструментов из ответа /market-data/last-prices"""
+        prices = {}
+        if response:
+            for price_data in response.get('last_prices', []):
+                ticker = figi_to_ticker.get(price_data.get('figi'))
+                if ticker:
+                    prices[ticker] = float(price_data.get('price', 0))
+
+        logger.debug("Получены цены для {} из {} инструментов", len(prices), requested)
+        return prices
+
+    def get_candles(self, ticker: str, interval: str = '1day', days: int = 30,
+                    as_array: bool = False) -> Optional[Union[List[Dict], 'np.ndarray']]:
+        """
+        Получение свечей (исторических данных)
+        
+        При as_array=True ответ разбирается потоково и возвращается
+        структурированный массив NumPy с полями CANDLE_DTYPE вместо
+        списка словарей.
+        """
         instrument = self.get_instrument_by_ticker(ticker)
         
         if not instrument:
@@ -164,37 +502,166 @@ class AlfaBroker:
         if not figi:
             return None
         
-        # Рассчитываем временной интервал
-        end_time = datetime.now()
-        start_time = end_time - timedelta(days=days)
+        params = self._candles_params(figi, interval, days)
         
-        params = {
+        if as_array:
+            candles = self._stream_candles(params, days * CANDLES_PER_DAY.get(interval, 24 * 60))
+            if candles is not None:
+                logger.debug("Получено {} свечей для {}", len(candles), ticker)
+            return candles
+        
+        response = self._make_request('GET', '/market-data/candles', params)
+        return self._parse_candles(ticker, response)
+    
+    def get_candles_arr(self, ticker: str, interval: str = '1day', days: int = 30) -> Optional['np.ndarray']:
+        """Свечи в виде структурированного массива CANDLE_DTYPE"""
+        return self.get_candles(ticker, interval=interval, days=days, as_array=True)
+    
+    def _stream_candles(self, params: Dict[str, str], capacity: int) -> Optional['np.ndarray']:
+        """Потоковый разбор свечей сразу в предвыделенный массив CANDLE_DTYPE"""
+        import ijson
+        import numpy as np
+        
+        try:
+            with self.session.get(f"{self.base_url}/market-data/candles", params=params,
+                                  timeout=REQUEST_TIMEOUT, stream=True) as response:
+                if response.status_code != 200:
+                    logger.error("Ошибка API: {} - {}", response.status_code, response.text)
+                    return None
+                
+                response.raw.decode_content = True
+                candles = np.empty(max(capacity, 1), dtype=CANDLE_DTYPE)
+                count = 0
+                
+                for candle in ijson.items(response.raw, 'candles.item'):
+                    if count == len(candles):
+                        grown = np.empty(len(candles) * 2, dtype=CANDLE_DTYPE)
+                        grown[:count] = candles
+                        candles = grown
+                    
+                    candles[count] = (
+                        self._parse_candle_time(candle.get('time')),
+                        float(candle.get('open', 0)),
+                        float(candle.get('high', 0)),
+                        float(candle.get('low', 0)),
+                        float(candle.get('close', 0)),
+                        int(candle.get('volume', 0))
+                    )
+                    count += 1
+                
+                return candles[:count]
+                
+        except Exception as e:
+            logger.error("Ошибка потокового получения свечей: {}", e)
+            return None
+    
+    @staticmethod
+    def _parse_candle_time(value: Optional[str]):
+        """Время свечи (ISO 8601) в numpy.datetime64 по UTC"""
+        import numpy as np
+        
+        if not value:
+            return np.datetime64('NaT')
+        
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return np.datetime64(moment, 's')
+    
+    async def get_candles_async(self, ticker: str, interval: str = '1day', days: int = 30) -> Optional[List[Dict]]:
+        """Асинхронное получение свечей (исторических данных)"""
+        instrument = await self.get_instrument_by_ticker_async(ticker)
+        
+        if not instrument:
+            return None
+        
+        figi = instrument.get('figi')
+        if not figi:
+            return None
+        
+        response = await self._amake_request('GET', '/market-data/candles', self._candles_params(figi, interval, days))
+        return self._parse_candles(ticker, response)
+    
+    @staticmethod
+    def _candles_params(figi: str, interval: str, days: int) -> Dict[str, str]:
+        """Параметры запроса свечей за последние days дней"""
+        return AlfaBroker._candles_range_params(figi, interval, datetime.now() - timedelta(days=days))
+    
+    @staticmethod
+    def _candles_range_params(figi: str, interval: str, start_time: datetime) -> Dict[str, str]:
+        """Параметры запроса свечей начиная с start_time"""
+        end_time = datetime.now(start_time.tzinfo)
+        
+        return {
             'figi': figi,
             'interval': interval,
             'from': start_time.isoformat(),
             'to': end_time.isoformat()
         }
+    
+    def get_candles_since(self, ticker: str, interval: str, since: datetime) -> Optional[List[Dict]]:
+        """Получение свечей начиная с момента since (включая незакрытую)"""
+        figi = self._figi(ticker)
+        if not figi:
+            return None
         
-        response = self._make_request('GET', '/market-data/candles', params)
+        response = self._make_request('GET', '/market-data/candles',
+                                      self._candles_range_params(figi, interval, since))
+        return self._parse_candles(ticker, response)
+    
+    async def get_candles_since_async(self, ticker: str, interval: str, since: datetime) -> Optional[List[Dict]]:
+        """Асинхронное получение свечей начиная с момента since"""
+        instrument = await self.get_instrument_by_ticker_async(ticker)
+        figi = self._instrument_figi(ticker, instrument)
+        if not figi:
+            return None
         
+        response = await self._amake_request('GET', '/market-data/candles',
+                                             self._candles_range_params(figi, interval, since))
+        return self._parse_candles(ticker, response)
+    
+    def _parse_candles(self, ticker: str, response: Optional[Dict]) -> Optional[List[Dict]]:
+        """Извлечение свечей из ответа /market-data/candles"""
         if response:
             candles = response.get('candles', [])
-            logger.info(f"Получено {len(candles)} свечей для {ticker}")
+            logger.debug("Получено {} свечей для {}", len(candles), ticker)
             return candles
         
         return None
     
+    @staticmethod
+    def candles_to_df(candles: Union[List[Dict], 'np.ndarray']) -> 'pd.DataFrame':
+        """
+        Свечи (список словарей или массив CANDLE_DTYPE) в DataFrame
+        
+        Числовые колонки приводятся к компактным типам за один проход,
+        а изменение цены за свечу (pct_change, %) считается векторно.
+        """
+        import pandas as pd
+        
+        df = pd.DataFrame(candles)
+        if df.empty:
+            return df
+        
+        for column in ('open', 'close', 'high', 'low'):
+            df[column] = pd.to_numeric(df[column], downcast='float')
+        df['volume'] = pd.to_numeric(df['volume'], downcast='integer')
+        df['time'] = pd.to_datetime(df['time'])
+        
+        df['pct_change'] = ((df['close'] - df['open']) / df['open'] * 100).where(df['open'] > 0, 0)
+        return df
+    
     def place_market_order(self, ticker: str, quantity: int, direction: str) -> Optional[Dict]:
         """Размещение рыночного ордера"""
         instrument = self.get_instrument_by_ticker(ticker)
         
         if not instrument:
-            logger.error(f"Не удалось найти инструмент {ticker}")
+            logger.error("Не удалось найти инструмент {}", ticker)
             return None
         
         figi = instrument.get('figi')
         if not figi:
-            logger.error(f"FIGI не найден для {ticker}")
+            logger.error("FIGI не найден для {}", ticker)
             return None
         
         order_data = {
@@ -205,16 +672,16 @@ class AlfaBroker:
             'order_type': 'ORDER_TYPE_MARKET'
         }
         
-        logger.info(f"Размещение {direction} ордера: {quantity} {ticker}")
+        logger.info("Размещение {} ордера: {} {}", direction, quantity, ticker)
         
         response = self._make_request('POST', '/orders', order_data)
         
         if response:
             order_id = response.get('order_id')
-            logger.info(f"Ордер размещен: {order_id}")
+            logger.info("Ордер размещен: {}", order_id)
             return response
         
-        logger.error(f"Не удалось разместить ордер для {ticker}")
+        logger.error("Не удалось разместить ордер для {}", ticker)
         return None
     
     def buy_market(self, ticker: str, quantity: int) -> Optional[Dict]:
@@ -231,7 +698,7 @@ class AlfaBroker:
         
         if response:
             orders = response.get('orders', [])
-            logger.info(f"Получено ордеров: {len(orders)}")
+            logger.info("Получено ордеров: {}", len(orders))
             return orders
         
         return None
@@ -241,10 +708,10 @@ class AlfaBroker:
         response = self._make_request('POST', f'/orders/{order_id}/cancel')
         
         if response:
-            logger.info(f"Ордер {order_id} отменен")
+            logger.info("Ордер {} отменен", order_id)
             return True
         
-        logger.error(f"Не удалось отменить ордер {order_id}")
+        logger.error("Не удалось отменить ордер {}", order_id)
         return False
     
     def get_operations(self, days: int = 7) -> Optional[List[Dict]]:
@@ -262,7 +729,7 @@ class AlfaBroker:
         
         if response:
             operations = response.get('operations', [])
-            logger.info(f"Получено операций: {len(operations)}")
+            logger.info("Получено операций: {}", len(operations))
             return operations
         
         return None
\ No newline at end of file
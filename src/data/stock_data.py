@@ -2,12 +2,31 @@
 Модуль для получения данных о акциях
 """
 
-import yfinance as yf
-import pandas as pd
-from typing import Optional, Dict, Any
+import os
+import math
+import time
+import hashlib
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
 from loguru import logger
 from datetime import datetime, timedelta
 
+# yfinance и pandas импортируются внутри методов: их загрузка занимает
+# сотни миллисекунд, а сценариям без Yahoo Finance они не нужны
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Колонки исторических данных, которые нужны модели (хранятся во float32)
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Единицы периодов yfinance и соответствующие смещения pandas
+# (периоды в днях считаются в торговых днях и обрезаются по числу строк)
+_PERIOD_UNITS = {
+    'wk': 'weeks',
+    'mo': 'months',
+    'y': 'years',
+}
+
 
 class StockDataProvider:
     """Класс для получения данных о акциях"""
@@ -15,57 +34,248 @@ class StockDataProvider:
     def __init__(self, config):
         """Инициализация провайдера данных"""
         self.config = config
-        self.cache = {}
+        self.cache = {}  # {symbol: (время загрузки, (текущая цена, предыдущая цена))}
+        self.price_cache_ttl = config.get('PRICE_CACHE_TTL', 60)
+        
+        # Дисковый кэш исторических данных
+        self.cache_dir = os.path.expanduser(config.get('DATA_CACHE_DIR', '~/.tardebot_cache'))
+        self.cache_ttl = config.get('DATA_CACHE_TTL', 3600)
+        self.cache_refresh = config.get('DATA_CACHE_REFRESH', 86400)
         
     def get_current_price(self, symbol: str) -> Optional[float]:
         """Получить текущую цену акции"""
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period="1d", interval="1m")
+            # Пара цен кэшируется, поэтому текущая и предыдущая цена
+            # за один цикл бота получаются одним запросом
+            prices = self.get_price_pair(symbol)
             
-            if data.empty:
-                logger.warning(f"Нет данных для символа {symbol}")
+            if prices is None:
+                logger.warning("Нет данных для символа {}", symbol)
                 return None
                 
-            current_price = data['Close'].iloc[-1]
-            logger.info(f"Текущая цена {symbol}: ${current_price:.2f}")
-            return float(current_price)
+            return prices[0]
             
         except Exception as e:
-            logger.error(f"Ошибка получения текущей цены для {symbol}: {e}")
+            logger.error("Ошибка получения текущей цены для {}: {}", symbol, e)
             return None
     
-    def get_historical_data(self, symbol: str, period: str = "1y") -> Optional[pd.DataFrame]:
-        """Получить исторические данные"""
+    def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Получить текущие цены нескольких акций одной пакетной загрузкой"""
+        import pandas as pd
+        import yfinance as yf
+        
+        try:
+            data = yf.download(
+                tickers=symbols,
+                period="1d",
+                interval="1m",
+                threads=True,
+                progress=False
+            )
+            
+            close = data['Close']
+            if isinstance(close, pd.Series):
+                # Для одного тикера yfinance возвращает плоские колонки
+                close = close.to_frame(symbols[0])
+            
+            prices = {}
+            for symbol in symbols:
+                if symbol not in close:
+                    continue
+                
+                series = close[symbol].dropna()
+                if series.empty:
+                    logger.warning("Нет данных для символа {}", symbol)
+                    continue
+                
+                prices[symbol] = float(series.iloc[-1])
+            
+            logger.info("Получены цены для {} из {} символов", len(prices), len(symbols))
+            return prices
+            
+        except Exception as e:
+            logger.error("Ошибка пакетного получения цен: {}", e)
+            return {}
+    
+    def get_historical_data(self, symbol: str, period: str = "1y") -> Optional['pd.DataFrame']:
+        """
+        Получить исторические данные (с дисковым кэшем)
+        
+        Возвращает только колонки HISTORY_COLUMNS с типом float32:
+        дивиденды и сплиты модели не нужны, а половинная точность
+        вдвое сокращает объем данных для последующих расчетов.
+        """
+        import pandas as pd
+        import yfinance as yf
+        
         try:
+            path = self._cache_path(symbol, period)
+            cached = self._read_cache(path)
+            
+            if cached is not None and time.time() - os.path.getmtime(path) < self.cache_ttl:
+                logger.info("Исторические данные для {} взяты из кэша ({} записей)",
+                            symbol, len(cached))
+                return self._compact(cached)
+            
             ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period)
+            
+            data = None
+            if (cached is not None and not cached.empty
+                    and self._full_fetch_age(path) < self.cache_refresh):
+                # Догружаем только новые свечи начиная с последней сохраненной
+                data = self._append_tail(ticker, cached, period)
+            
+            full_fetch = data is None
+            if full_fetch:
+                data = ticker.history(period=period)
             
             if data.empty:
-                logger.warning(f"Нет исторических данных для {symbol}")
+                logger.warning("Нет исторических данных для {}", symbol)
                 return None
-                
-            logger.info(f"Получено {len(data)} записей исторических данных для {symbol}")
+            
+            data = self._compact(data)
+            
+            self._write_cache(path, data, full_fetch)
+            
+            logger.info("Получено {} записей исторических данных для {}", len(data), symbol)
             return data
             
         except Exception as e:
-            logger.error(f"Ошибка получения исторических данных для {symbol}: {e}")
+            logger.error("Ошибка получения исторических данных для {}: {}", symbol, e)
+            return None
+    
+    def _append_tail(self, ticker, cached: 'pd.DataFrame', period: str) -> Optional['pd.DataFrame']:
+        """
+        Догрузка новых свечей к данным из кэша
+        
+        history() пересчитывает прошлые цены с учетом сплитов и дивидендов,
+        поэтому после корпоративного события кэш и новый хвост оказываются
+        в разных базах. Событие видно по цене открытия общей свечи (она не
+        меняется в течение дня): если цена отличается, возвращается None и
+        данные загружаются целиком.
+        """
+        import pandas as pd
+        
+        last = cached.index[-1]
+        tail = ticker.history(start=last)
+        if tail.empty:
+            return cached
+        
+        if last in tail.index and not math.isclose(
+                float(tail.at[last, 'Open']), float(cached.at[last, 'Open']), rel_tol=1e-4):
+            logger.info("Цены пересчитаны после сплита или дивидендов, кэш загружается заново")
+            return None
+        
+        data = pd.concat([cached, tail])
+        data = data[~data.index.duplicated(keep='last')]
+        return self._trim_to_period(data, period)
+    
+    def _cache_path(self, symbol: str, period: str) -> str:
+        """Путь к файлу кэша для пары (символ, период)"""
+        key = hashlib.md5(f"{symbol}:{period}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+    
+    def _read_cache(self, path: str) -> Optional['pd.DataFrame']:
+        """Чтение данных из кэша"""
+        import pandas as pd
+        
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning("Не удалось прочитать кэш {}: {}", path, e)
             return None
     
+    @staticmethod
+    def _full_fetch_age(path: str) -> float:
+        """Секунды с последней полной загрузки данных кэша"""
+        marker = path + '.full'
+        if not os.path.exists(marker):
+            return math.inf
+        return time.time() - os.path.getmtime(marker)
+    
+    def _write_cache(self, path: str, data: 'pd.DataFrame', full_fetch: bool = False) -> None:
+        """
+        Сохранение данных в кэш
+        
+        Время полной загрузки хранится в отдельном файле-метке: mtime
+        самого кэша обновляется и при догрузке хвоста.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            data.to_parquet(path)
+            if full_fetch:
+                with open(path + '.full', 'w'):
+                    pass
+        except Exception as e:
+            logger.warning("Не удалось сохранить кэш {}: {}", path, e)
+    
+    @staticmethod
+    def _compact(data: 'pd.DataFrame') -> 'pd.DataFrame':
+        """Оставить колонки OHLCV и привести их к float32"""
+        return data[HISTORY_COLUMNS].astype('float32', copy=False)
+    
+    @staticmethod
+    def _trim_to_period(data: 'pd.DataFrame', period: str) -> 'pd.DataFrame':
+        """Обрезка данных до окна периода (например, "1y" или "3mo")"""
+        import pandas as pd
+        
+        if period.endswith('d') and period[:-1].isdigit():
+            return data.iloc[-int(period[:-1]):]
+        
+        for unit, offset_name in _PERIOD_UNITS.items():
+            if period.endswith(unit) and period[:-len(unit)].isdigit():
+                offset = pd.DateOffset(**{offset_name: int(period[:-len(unit)])})
+                return data[data.index >= data.index[-1] - offset]
+        
+        # "max", "ytd" и прочие периоды не обрезаем
+        return data
+    
     def get_previous_price(self, symbol: str) -> Optional[float]:
         """Получить предыдущую цену закрытия"""
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period="2d")
+            prices = self.get_price_pair(symbol)
             
-            if len(data) < 2:
-                logger.warning(f"Недостаточно данных для получения предыдущей цены {symbol}")
+            if prices is None:
+                logger.warning("Недостаточно данных для получения предыдущей цены {}", symbol)
                 return None
                 
-            previous_price = data['Close'].iloc[-2]
-            logger.info(f"Предыдущая цена {symbol}: ${previous_price:.2f}")
-            return float(previous_price)
+            return prices[1]
+            
+        except Exception as e:
+            logger.error("Ошибка получения предыдущей цены для {}: {}", symbol, e)
+            return None
+    
+    def get_price_pair(self, symbol: str) -> Optional[Tuple[float, float]]:
+        """
+        Получить текущую и предыдущую цену закрытия одним запросом
+        
+        Две дневные свечи — самый легкий запрос yfinance: fast_info для
+        last_price загружает историю за год, а previous_close учитывает
+        торги вне основной сессии.
+        """
+        import yfinance as yf
+        
+        try:
+            cached = self.cache.get(symbol)
+            if cached is not None and time.time() - cached[0] < self.price_cache_ttl:
+                return cached[1]
+            
+            close = yf.Ticker(symbol).history(period="2d", interval="1d")['Close'].dropna()
+            
+            if len(close) < 2:
+                logger.warning("Недостаточно данных для получения цен {}", symbol)
+                return None
+            
+            current_price = float(close.iloc[-1])
+            previous_price = float(close.iloc[-2])
+            self.cache[symbol] = (time.time(), (current_price, previous_price))
+            logger.info("Цены {}: текущая ${:.2f}, предыдущая ${:.2f}",
+                        symbol, current_price, previous_price)
+            return current_price, previous_price
             
         except Exception as e:
-            logger.error(f"Ошибка получения предыдущей цены для {symbol}: {e}")
-            return None
\ No newline at end of file
+            logger.error("Ошибка получения цен для {}: {}", symbol, e)
+            return None
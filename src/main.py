@@ -5,18 +5,13 @@ TardeBot - Главный модуль алгоритмического трей
 """
 
 import sys
-import os
 from loguru import logger
 
-# Добавляем путь к модулям проекта
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-from data.stock_data import StockDataProvider
-from models.price_predictor import PricePredictor
-from trading.bot import TradingBot
-from trading.alfa_trading_bot import AlfaTradingBot
-from utils.config import Config
-from utils.logger import setup_logger
+from tardebot.data.stock_data import StockDataProvider
+from tardebot.models.price_predictor import PricePredictor
+from tardebot.trading.bot import TradingBot
+from tardebot.utils.config import Config
+from tardebot.utils.logger import setup_logger
 
 
 def main():
@@ -42,6 +37,8 @@ def main():
         
         if use_alfa_broker:
             logger.info("Запуск с интеграцией Альфа-Инвестиций")
+            # Брокер и его HTTP-клиенты загружаются только в этом режиме
+            from tardebot.trading.alfa_trading_bot import AlfaTradingBot
             bot = AlfaTradingBot(data_provider, predictor, config)
         else:
             logger.info("Запуск в демонстрационном режиме")
@@ -53,7 +50,7 @@ def main():
         bot.run()
         
     except Exception as e:
-        logger.error(f"Ошибка при запуске бота: {e}")
+        logger.error("Ошибка при запуске бота: {}", e)
         sys.exit(1)
 
 
@@ -2,15 +2,122 @@
 Модуль для предсказания цен акций с помощью машинного обучения
 """
 
+import os
+import json
+import time
+from collections import deque
+
 import numpy as np
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from typing import Optional, Tuple, List
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Optional, Tuple, List, Dict, Any, TYPE_CHECKING
 from loguru import logger
 
+from ..utils._njit import njit
+
+# pandas, scikit-learn и LightGBM импортируются внутри методов: их загрузка
+# занимает сотни миллисекунд, а для инференса по свечам они не нужны
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _sma(values: np.ndarray, window: int) -> np.ndarray:
+    """Скользящее среднее через разности накопленных сумм; первые window-1 значений NaN"""
+    result = np.full(values.shape[0], np.nan)
+    cumsum = np.cumsum(np.concatenate(([0.0], values)))
+    result[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+    return result
+
+
+def _pct_change(values: np.ndarray) -> np.ndarray:
+    """Относительное изменение к предыдущему значению (аналог Series.pct_change)"""
+    result = np.full(values.shape[0], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = values[1:] / values[:-1] - 1.0
+    return result
+
+
+def _lags(values: np.ndarray, window_size: int) -> np.ndarray:
+    """Матрица лагов 1..window_size (строка t — значения t-1, ..., t-window_size)"""
+    result = np.full((values.shape[0], window_size), np.nan)
+    if values.shape[0] > window_size:
+        # Окно [t-window_size, ..., t] без копирования; берем его в обратном порядке без t
+        windows = sliding_window_view(values, window_size + 1)
+        result[window_size:] = windows[:, -2::-1]
+    return result
+
+
+@njit(cache=True)
+def _rsi_loop(close: np.ndarray, window: int) -> Tuple[np.ndarray, float, float]:
+    """
+    RSI со сглаживанием Уайлдера (alpha = 1/window)
+    
+    Начальные средние рост/падение — простое среднее первых window
+    приращений, дальше каждый бар обновляет их за O(1). Кроме ряда RSI
+    возвращает итоговые средние, чтобы продолжить расчет по новым барам.
+    """
+    n = close.shape[0]
+    result = np.full(n, np.nan)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        gain = 0.0
+        loss = 0.0
+        if delta > 0:
+            gain = delta
+        elif delta < 0:
+            loss = -delta
+        
+        if i <= window:
+            avg_gain += gain / window
+            avg_loss += loss / window
+            if i < window:
+                continue
+        else:
+            avg_gain = (avg_gain * (window - 1) + gain) / window
+            avg_loss = (avg_loss * (window - 1) + loss) / window
+        
+        if avg_loss > 0:
+            result[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        elif avg_gain > 0:
+            result[i] = 100.0
+    
+    return result, avg_gain, avg_loss
+
+
+def _rsi_value(avg_gain: float, avg_loss: float) -> float:
+    """RSI по средним росту и падению (как в _rsi_loop)"""
+    if avg_loss > 0:
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    if avg_gain > 0:
+        return 100.0
+    return np.nan
+
+
+def _bar_time(value) -> 'pd.Timestamp':
+    """
+    Время бара как pd.Timestamp по UTC
+    
+    Индекс истории yfinance содержит часовой пояс, а брокер может отдать
+    время свечи строкой без него; наивное время считается временем UTC.
+    """
+    import pandas as pd
+    
+    moment = pd.Timestamp(value)
+    if moment.tzinfo is None:
+        return moment.tz_localize('UTC')
+    return moment.tz_convert('UTC')
+
+
+def _feature_names(window_size: int) -> List[str]:
+    """Имена признаков в порядке колонок матрицы prepare_features"""
+    names = ['Open', 'High', 'Low', 'Volume', 'SMA_5', 'SMA_20', 'RSI',
+             'Price_Change', 'Volume_Change']
+    for i in range(1, window_size + 1):
+        names += [f'Close_lag_{i}', f'Volume_lag_{i}']
+    return names
+
 
 class PricePredictor:
     """Класс для предсказания цен акций"""
@@ -19,117 +126,425 @@ class PricePredictor:
         """Инициализация предиктора"""
         self.config = config
         self.model = None
-        self.scaler = MinMaxScaler()
+        self._booster = None  # Booster обученной модели для быстрого инференса
+        self._session = None  # Сессия ONNX Runtime (если модель экспортирована)
         self.is_trained = False
         self.feature_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        self._feature_cols = None  # Порядок признаков, на котором обучена модель
+        self._state = None  # Скользящее состояние признаков для update_one
+        
+    def prepare_features(self, data: 'pd.DataFrame', window_size: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Подготовка признаков для модели
         
-    def prepare_features(self, data: pd.DataFrame, window_size: int = 5) -> pd.DataFrame:
-        """Подготовка признаков для модели"""
+        Возвращает матрицу признаков float32 (колонки в порядке
+        self._feature_cols) и цены закрытия для тех же строк. Входной
+        DataFrame не копируется: признаки пишутся сразу в одну матрицу.
+        """
         try:
-            df = data.copy()
+            close = data['Close'].to_numpy(dtype=np.float64)
+            volume = data['Volume'].to_numpy(dtype=np.float64)
             
-            # Технические индикаторы
-            df['SMA_5'] = df['Close'].rolling(window=5).mean()
-            df['SMA_20'] = df['Close'].rolling(window=20).mean()
-            df['RSI'] = self._calculate_rsi(df['Close'])
-            df['Price_Change'] = df['Close'].pct_change()
-            df['Volume_Change'] = df['Volume'].pct_change()
+            self._feature_cols = _feature_names(window_size)
+            features = np.empty((len(close), len(self._feature_cols)), dtype=np.float32)
             
-            # Лаговые признаки
-            for i in range(1, window_size + 1):
-                df[f'Close_lag_{i}'] = df['Close'].shift(i)
-                df[f'Volume_lag_{i}'] = df['Volume'].shift(i)
+            features[:, 0] = data['Open'].to_numpy()
+            features[:, 1] = data['High'].to_numpy()
+            features[:, 2] = data['Low'].to_numpy()
+            features[:, 3] = volume
+            features[:, 4] = _sma(close, 5)
+            features[:, 5] = _sma(close, 20)
+            features[:, 6], _, _ = _rsi_loop(close, 14)
+            features[:, 7] = _pct_change(close)
+            features[:, 8] = _pct_change(volume)
+            
+            # Лаговые признаки чередуются: Close_lag_1, Volume_lag_1, Close_lag_2, ...
+            features[:, 9::2] = _lags(close, window_size)
+            features[:, 10::2] = _lags(volume, window_size)
             
             # Удаляем строки с NaN
-            df = df.dropna()
+            valid = ~np.isnan(features).any(axis=1)
+            features, close = features[valid], close[valid]
             
-            logger.info(f"Подготовлено {len(df)} записей с признаками")
-            return df
+            logger.info("Подготовлено {} записей с признаками", len(features))
+            return features, close
             
         except Exception as e:
-            logger.error(f"Ошибка подготовки признаков: {e}")
-            return pd.DataFrame()
-    
-    def _calculate_rsi(self, prices: pd.Series, window: int = 14) -> pd.Series:
-        """Расчет индекса относительной силы (RSI)"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-    
-    def train_model(self, data: pd.DataFrame) -> bool:
+            logger.error("Ошибка подготовки признаков: {}", e)
+            return np.empty((0, 0), dtype=np.float32), np.empty(0)
+    
+    def _calculate_rsi(self, prices: 'pd.Series', window: int = 14) -> 'pd.Series':
+        """Расчет индекса относительной силы (RSI) со сглаживанием Уайлдера"""
+        import pandas as pd
+        
+        rsi, _, _ = _rsi_loop(prices.to_numpy(dtype=np.float64, copy=False), window)
+        return pd.Series(rsi, index=prices.index)
+    
+    def train_model(self, data: 'pd.DataFrame') -> bool:
         """Обучение модели предсказания"""
+        from lightgbm import LGBMRegressor
+        from sklearn.metrics import mean_absolute_error, mean_squared_error
+        
         try:
-            # Подготовка данных
-            df = self.prepare_features(data)
-            if df.empty:
+            # Подготовка данных. Деревья решений инвариантны к монотонным
+            # преобразованиям, поэтому признаки подаются без нормализации
+            X, y = self.prepare_features(data)
+            if len(X) == 0:
                 logger.error("Нет данных для обучения")
                 return False
             
-            # Выбор признаков и целевой переменной
-            feature_cols = [col for col in df.columns if col not in ['Close']]
-            X = df[feature_cols]
-            y = df['Close']
-            
-            # Нормализация данных
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Разделение на обучающую и тестовую выборки
-            X_train, X_test, y_train, y_test = train_test_split(
-                X_scaled, y, test_size=0.2, random_state=42
-            )
+            # Разделение на обучающую и тестовую выборки по времени:
+            # модель проверяется на последних 20% баров (срезы без копирования)
+            cut = int(len(X) * 0.8)
+            X_train, X_test = X[:cut], X[cut:]
+            y_train, y_test = y[:cut], y[cut:]
             
             # Обучение модели
-            self.model = RandomForestRegressor(
-                n_estimators=100,
+            self.model = LGBMRegressor(
+                n_estimators=200,
+                num_leaves=31,
+                learning_rate=0.05,
+                n_jobs=-1,
+                force_row_wise=True,
                 random_state=42,
-                n_jobs=-1
+                verbose=-1
             )
             
             self.model.fit(X_train, y_train)
+            self._booster = self.model.booster_
+            self._session = None  # Сессия ONNX относится к прежней модели
             
             # Оценка качества модели
             y_pred = self.model.predict(X_test)
             mae = mean_absolute_error(y_test, y_pred)
             mse = mean_squared_error(y_test, y_pred)
             
-            logger.info(f"Модель обучена. MAE: {mae:.2f}, MSE: {mse:.2f}")
+            logger.info("Модель обучена. MAE: {:.2f}, MSE: {:.2f}", mae, mse)
+            
+            # Дальнейшие бары считаются инкрементально от конца истории
+            self.init_state(data)
             
             self.is_trained = True
             return True
             
         except Exception as e:
-            logger.error(f"Ошибка обучения модели: {e}")
+            logger.error("Ошибка обучения модели: {}", e)
             return False
     
-    def predict_price(self, current_data: pd.DataFrame) -> Optional[float]:
+    def predict_price(self, current_data: 'pd.DataFrame') -> Optional[float]:
         """Предсказание будущей цены"""
         try:
-            if not self.is_trained or self.model is None:
+            if not self._can_predict():
                 logger.error("Модель не обучена")
                 return None
             
             # Подготовка данных для предсказания
-            df = self.prepare_features(current_data)
-            if df.empty:
+            features, _ = self.prepare_features(current_data)
+            if len(features) == 0:
                 logger.error("Нет данных для предсказания")
                 return None
             
-            # Получаем последнюю запись
-            feature_cols = [col for col in df.columns if col not in ['Close']]
-            X = df[feature_cols].iloc[-1:]
+            # Последняя запись
+            X = features[-1:]
+            
+            predicted_price = self._predict_row(X)
+            
+            logger.info("Предсказанная цена: ${:.2f}", predicted_price)
+            return predicted_price
+            
+        except Exception as e:
+            logger.error("Ошибка предсказания цены: {}", e)
+            return None
+    
+    def predict_batch(self, recent_data: 'pd.DataFrame', horizon: int = 10) -> Optional[np.ndarray]:
+        """Предсказания для последних horizon баров одним вызовом модели"""
+        try:
+            if not self._can_predict():
+                logger.error("Модель не обучена")
+                return None
+            
+            features, _ = self.prepare_features(recent_data)
+            if len(features) == 0:
+                logger.error("Нет данных для предсказания")
+                return None
+            
+            X = features[-horizon:]
+            
+            if self._session is not None:
+                return self._session.run(None, {'X': X})[0].ravel()
+            
+            return self._booster.predict(X, predict_disable_shape_check=True)
+            
+        except Exception as e:
+            logger.error("Ошибка пакетного предсказания цен: {}", e)
+            return None
+    
+    def _can_predict(self) -> bool:
+        """Есть ли модель для инференса (LightGBM или сессия ONNX Runtime)"""
+        return self.is_trained and (self._session is not None or self.model is not None)
+    
+    def _predict_row(self, X: np.ndarray) -> float:
+        """Предсказание по одной строке признаков"""
+        X = X.astype(np.float32, copy=False)
+        
+        if self._session is not None:
+            # Деревья исполняются в C++ средствами ONNX Runtime
+            return float(self._session.run(None, {'X': X})[0].ravel()[0])
+        
+        # Предсказание одной строки: в одном потоке быстрее,
+        # чем поднимать пул потоков на каждый вызов
+        return float(self._booster.predict(
+            X,
+            num_threads=1,
+            predict_disable_shape_check=True
+        )[0])
+    
+    def init_state(self, data: 'pd.DataFrame', window_size: int = 5, rsi_window: int = 14) -> bool:
+        """
+        Инициализация скользящего состояния признаков по истории
+        
+        Последний бар истории считается незакрытым: он хранится отдельно
+        и фиксируется в состоянии только когда придет бар с другим временем.
+        Так повторные вызовы update_one в течение одного дня не сдвигают окна.
+        """
+        try:
+            if len(data) < 21:
+                logger.error("Недостаточно истории для инициализации признаков")
+                return False
+            
+            history = data.iloc[:-1]
+            close = history['Close'].to_numpy(dtype=np.float64)
+            volume = history['Volume'].to_numpy(dtype=np.float64)
+            
+            _, avg_gain, avg_loss = _rsi_loop(close, rsi_window)
+            
+            closes = deque(close[-20:], maxlen=20)
+            self._state = {
+                'window_size': window_size,
+                'rsi_window': rsi_window,
+                'closes': closes,
+                'volumes': deque(volume[-window_size:], maxlen=window_size),
+                'sma5_sum': float(sum(list(closes)[-5:])),
+                'sma20_sum': float(sum(closes)),
+                'avg_gain': float(avg_gain),
+                'avg_loss': float(avg_loss),
+                'pending': self._row_to_candle(data.index[-1], data.iloc[-1]),
+            }
+            return True
+            
+        except Exception as e:
+            logger.error("Ошибка инициализации признаков: {}", e)
+            self._state = None
+            return False
+    
+    @staticmethod
+    def _row_to_candle(index, row: 'pd.Series') -> Dict[str, Any]:
+        """Строка DataFrame OHLCV в формате свечи брокера"""
+        return {
+            'time': index,
+            'open': row['Open'],
+            'high': row['High'],
+            'low': row['Low'],
+            'close': row['Close'],
+            'volume': row['Volume'],
+        }
+    
+    def _commit(self, candle: Dict[str, Any]) -> None:
+        """Зафиксировать закрытый бар в скользящем состоянии (O(1))"""
+        state = self._state
+        closes = state['closes']
+        volumes = state['volumes']
+        window = state['rsi_window']
+        
+        close = float(candle['close'])
+        delta = close - closes[-1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        state['avg_gain'] = (state['avg_gain'] * (window - 1) + gain) / window
+        state['avg_loss'] = (state['avg_loss'] * (window - 1) + loss) / window
+        
+        # Выбывающие из окон значения вычитаются из сумм до сдвига буфера
+        state['sma5_sum'] += close - closes[-5]
+        state['sma20_sum'] += close - closes[0]
+        closes.append(close)
+        volumes.append(float(candle['volume']))
+    
+    def update_one(self, candle: Dict[str, Any]) -> np.ndarray:
+        """
+        Вектор признаков для нового бара за O(1)
+        
+        Свеча с тем же временем, что и предыдущая, считается обновлением
+        незакрытого бара; свеча с новым временем сначала фиксирует предыдущий.
+        """
+        state = self._state
+        pending = state['pending']
+        if pending is not None and _bar_time(pending['time']) != _bar_time(candle['time']):
+            self._commit(pending)
+        state['pending'] = candle
+        
+        closes = state['closes']
+        volumes = state['volumes']
+        window = state['rsi_window']
+        
+        close = float(candle['close'])
+        volume = float(candle['volume'])
+        prev_close = closes[-1]
+        prev_volume = volumes[-1]
+        
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        avg_gain = (state['avg_gain'] * (window - 1) + gain) / window
+        avg_loss = (state['avg_loss'] * (window - 1) + loss) / window
+        
+        values = {
+            'Open': float(candle['open']),
+            'High': float(candle['high']),
+            'Low': float(candle['low']),
+            'Volume': volume,
+            'SMA_5': (state['sma5_sum'] - closes[-5] + close) / 5,
+            'SMA_20': (state['sma20_sum'] - closes[0] + close) / 20,
+            'RSI': _rsi_value(avg_gain, avg_loss),
+            'Price_Change': close / prev_close - 1.0,
+            'Volume_Change': volume / prev_volume - 1.0,
+        }
+        for i in range(1, state['window_size'] + 1):
+            values[f'Close_lag_{i}'] = closes[-i]
+            values[f'Volume_lag_{i}'] = volumes[-i]
+        
+        return np.array([[values[col] for col in self._feature_cols]], dtype=np.float64)
+    
+    def predict_next(self, candle: Dict[str, Any]) -> Optional[float]:
+        """Предсказание цены по последней свече без пересчета истории"""
+        try:
+            if not self._can_predict():
+                logger.error("Модель не обучена")
+                return None
+            
+            if self._state is None:
+                logger.error("Состояние признаков не инициализировано")
+                return None
             
-            # Нормализация
-            X_scaled = self.scaler.transform(X)
+            predicted_price = self._predict_row(self.update_one(candle))
             
-            # Предсказание
-            predicted_price = self.model.predict(X_scaled)[0]
+            logger.info("Предсказанная цена: ${:.2f}", predicted_price)
+            return predicted_price
             
-            logger.info(f"Предсказанная цена: ${predicted_price:.2f}")
-            return float(predicted_price)
+        except Exception as e:
+            logger.error("Ошибка предсказания цены: {}", e)
+            return None
+    
+    def save(self, path: str) -> bool:
+        """Сохранение обученной модели на диск"""
+        try:
+            if not self.is_trained or self.model is None:
+                logger.error("Модель не обучена")
+                return False
+            
+            import joblib
+            
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            joblib.dump({
+                'model': self.model,
+                'feature_cols': self._feature_cols,
+            }, path, compress=3)
+            
+            logger.info("Модель сохранена: {}", path)
+            return True
             
         except Exception as e:
-            logger.error(f"Ошибка предсказания цены: {e}")
-            return None
\ No newline at end of file
+            logger.error("Ошибка сохранения модели: {}", e)
+            return False
+    
+    def load(self, path: str, max_age: Optional[float] = None) -> bool:
+        """
+        Загрузка сохраненной модели
+        
+        max_age — допустимый возраст файла в секундах; более старая
+        модель не загружается, чтобы бот переобучился на свежих данных.
+        """
+        if not os.path.exists(path):
+            return False
+        
+        if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+            logger.info("Сохраненная модель {} устарела", path)
+            return False
+        
+        try:
+            import joblib
+            
+            saved = joblib.load(path)
+            
+            # Модель с другим набором признаков (старый формат файла)
+            # получила бы на вход сдвинутые колонки
+            if saved.get('feature_cols') != _feature_names(5):
+                logger.warning("Сохраненная модель {} обучена на других признаках", path)
+                return False
+            
+            self.model = saved['model']
+            self._booster = self.model.booster_
+            self._session = None  # Сессия ONNX относится к прежней модели
+            self._feature_cols = saved['feature_cols']
+            self.is_trained = True
+            
+            logger.info("Модель загружена: {}", path)
+            return True
+            
+        except Exception as e:
+            logger.error("Ошибка загрузки модели: {}", e)
+            return False
+    
+    def export_onnx(self, path: str) -> bool:
+        """Экспорт обученной модели в формат ONNX"""
+        try:
+            if not self.is_trained or self.model is None:
+                logger.error("Модель не обучена")
+                return False
+            
+            from onnxmltools import convert_lightgbm
+            from onnxmltools.convert.common.data_types import FloatTensorType
+            
+            onnx_model = convert_lightgbm(
+                self.model,
+                initial_types=[('X', FloatTensorType([None, self.model.n_features_in_]))]
+            )
+            
+            # Порядок признаков сохраняется в метаданных: ONNX модель
+            # должна работать и без файла LightGBM
+            meta = onnx_model.metadata_props.add()
+            meta.key = 'feature_cols'
+            meta.value = json.dumps(self._feature_cols)
+            
+            with open(path, 'wb') as f:
+                f.write(onnx_model.SerializeToString())
+            
+            logger.info("Модель экспортирована в ONNX: {}", path)
+            return True
+            
+        except Exception as e:
+            logger.error("Ошибка экспорта модели в ONNX: {}", e)
+            return False
+    
+    def load_onnx(self, path: str) -> bool:
+        """Загрузка ONNX модели для инференса через ONNX Runtime"""
+        try:
+            import onnxruntime as ort
+            
+            session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+            
+            metadata = session.get_modelmeta().custom_metadata_map
+            feature_cols = json.loads(metadata.get('feature_cols', 'null'))
+            if feature_cols != _feature_names(5):
+                logger.warning("ONNX модель {} обучена на других признаках", path)
+                return False
+            
+            self._session = session
+            self._feature_cols = feature_cols
+            self.is_trained = True
+            
+            logger.info("ONNX модель загружена: {}", path)
+            return True
+            
+        except Exception as e:
+            logger.error("Ошибка загрузки ONNX модели: {}", e)
+            return False
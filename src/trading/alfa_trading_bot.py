@@ -2,17 +2,43 @@
 Торговый бот с интеграцией Альфа-Инвестиций
 """
 
-import time
-from typing import Dict, Any, Optional
+import os
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List
+import numpy as np
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from ..brokers.alfa_broker import AlfaBroker
+from .trade_history import TradeHistory
+from .signals import decide, BUY, SELL
+
+
+# Сколько последних дневных свечей держать в кэше между циклами
+CANDLE_CACHE_SIZE = 90
+
+
+@dataclass
+class PortfolioState:
+    """Баланс и позиции счета, полученные один раз за торговый цикл"""
+    balance: Optional[float]
+    positions: Dict[str, Dict]  # {ticker: позиция из портфеля}
+    
+    def quantity(self, ticker: str) -> int:
+        """Количество бумаг тикера в портфеле"""
+        position = self.positions.get(ticker)
+        return int(position.get('balance', 0)) if position else 0
 
 
 class AlfaTradingBot:
     """Торговый бот для работы с Альфа-Инвестициями"""
     
+    # Источник данных обучения (свечи брокера в рублях): входит в имя файла модели
+    DATA_SOURCE = 'alfa'
+    # Запасной источник истории (Yahoo Finance), если брокер недоступен
+    FALLBACK_SOURCE = 'yfinance'
+    
     def __init__(self, data_provider, predictor, config):
         """Инициализация бота"""
         self.data_provider = data_provider
@@ -23,20 +49,31 @@ class AlfaTradingBot:
         self.broker = AlfaBroker(config)
         
         # Состояние бота
-        self.initial_balance = config.get('INITIAL_BALANCE', 100000.0)
+        self.initial_balance = config.ALFA_INITIAL_BALANCE
         self.positions = {}  # {ticker: quantity}
-        self.trade_history = []
+        self.trade_history = TradeHistory(config.TRADE_HISTORY_MAX)
         self.is_running = False
+        self._pred_cache = None  # (ключ последней свечи, предсказанная цена)
+        self._candle_cache: List[Dict] = []  # Последние дневные свечи
+        self._candle_cache_last_ts: Optional[datetime] = None  # Время последней свечи в кэше
         
         # Настройки торговли
-        self.symbol = config.get('DEFAULT_SYMBOL', 'SBER')
-        self.max_position_size = config.get('MAX_POSITION_SIZE', 0.1)
+        self.symbol = config.DEFAULT_SYMBOL
+        self.max_position_size = config.MAX_POSITION_SIZE
         self.prediction_threshold = 0.02  # 2% минимальное изменение для торговли
         
-        logger.info(f"Альфа-Бот инициализирован для торговли {self.symbol}")
+        logger.info("Альфа-Бот инициализирован для торговли {}", self.symbol)
     
     def run(self):
-        """Запуск основного цикла бота"""
+        """Запуск основного цикла бота (синхронная обертка над run_async)"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logger.info("Получен сигнал остановки")
+            self.stop()
+    
+    async def run_async(self):
+        """Асинхронный основной цикл бота"""
         logger.info("Запуск Альфа торгового бота...")
         
         # Проверяем подключение к брокеру
@@ -52,17 +89,17 @@ class AlfaTradingBot:
             return
         
         # Основной торговый цикл
-        while self.is_running:
-            try:
-                self._trading_cycle()
-                time.sleep(60)  # Пауза между циклами (1 минута)
-                
-            except KeyboardInterrupt:
-                logger.info("Получен сигнал остановки")
-                self.stop()
-            except Exception as e:
-                logger.error(f"Ошибка в торговом цикле: {e}")
-                time.sleep(30)  # Пауза при ошибке
+        try:
+            while self.is_running:
+                try:
+                    await self._trading_cycle()
+                    await asyncio.sleep(60)  # Пауза между циклами (1 минута)
+                    
+                except Exception as e:
+                    logger.error("Ошибка в торговом цикле: {}", e)
+                    await asyncio.sleep(30)  # Пауза при ошибке
+        finally:
+            await self.broker.aclose()
     
     def _check_broker_connection(self) -> bool:
         """Проверка подключения к брокеру"""
@@ -70,12 +107,12 @@ class AlfaTradingBot:
         
         account_info = self.broker.get_account_info()
         if account_info:
-            logger.info(f"Подключение успешно. Аккаунт: {account_info.get('name', 'N/A')}")
+            logger.info("Подключение успешно. Аккаунт: {}", account_info.get('name', 'N/A'))
             
             # Получаем текущий баланс
             balance = self.broker.get_balance()
             if balance:
-                logger.info(f"Текущий баланс: {balance:,.2f} RUB")
+                logger.info("Текущий баланс: {:,.2f} RUB", balance)
             
             return True
         
@@ -83,129 +120,208 @@ class AlfaTradingBot:
         return False
     
     def _train_model(self) -> bool:
-        """Обучение модели предсказания"""
-        logger.info("Обучение модели на данных из Альфа-Инвестиций...")
+        """Обучение модели предсказания (или загрузка недавно обученной)"""
+        model_path = self._model_path(self.DATA_SOURCE)
+        max_age = self.config.MODEL_CACHE_TTL_HOURS * 3600
         
-        # Получаем исторические данные через брокера
-        candles = self.broker.get_candles(self.symbol, interval='1day', days=365)
+        if self.predictor.load(model_path, max_age=max_age):
+            # Обучение не нужно, но скользящие признаки строятся по свежей истории
+            recent_data, _ = self._get_historical_data(days=120, period="6mo")
+            if recent_data is not None and not recent_data.empty and self.predictor.init_state(recent_data):
+                return True
         
-        if not candles:
-            logger.warning("Не удалось получить данные через брокера, используем альтернативный источник")
-            # Fallback на обычный провайдер данных
-            historical_data = self.data_provider.get_historical_data(
-                self.symbol, 
-                period="1y"
-            )
-        else:
-            # Конвертируем данные свечей в формат pandas
-            historical_data = self._convert_candles_to_dataframe(candles)
+        logger.info("Обучение модели на данных из Альфа-Инвестиций...")
+        
+        historical_data, source = self._get_historical_data(days=365, period="1y")
         
         if historical_data is None or historical_data.empty:
             logger.error("Не удалось получить исторические данные")
             return False
         
         # Обучаем модель
-        return self.predictor.train_model(historical_data)
+        if not self.predictor.train_model(historical_data):
+            return False
+        
+        # Модель, обученная на запасном источнике, сохраняется под его именем
+        # и не загружается при следующем запуске вместо модели по свечам брокера
+        self.predictor.save(self._model_path(source))
+        return True
+    
+    def _model_path(self, source: str) -> str:
+        """Путь к файлу модели, обученной на данных источника source"""
+        return os.path.join(self.config.MODEL_DIR, f"{self.symbol}_{source}.pkl")
+    
+    def _get_historical_data(self, days: int, period: str):
+        """Исторические данные через брокера (с запасным источником) и имя источника"""
+        candles = self.broker.get_candles_arr(self.symbol, interval='1day', days=days)
+        
+        if candles is None or len(candles) == 0:
+            logger.warning("Не удалось получить данные через брокера, используем альтернативный источник")
+            # Fallback на обычный провайдер данных
+            return self.data_provider.get_historical_data(self.symbol, period=period), self.FALLBACK_SOURCE
+        
+        # Конвертируем данные свечей в формат pandas
+        return self._convert_candles_to_dataframe(candles), self.DATA_SOURCE
     
     def _convert_candles_to_dataframe(self, candles):
-        """Конвертация свечей в DataFrame"""
+        """Конвертация свечей (список словарей или массив CANDLE_DTYPE) в DataFrame"""
         import pandas as pd
         
-        data = []
-        for candle in candles:
-            data.append({
-                'Open': float(candle.get('open', 0)),
-                'High': float(candle.get('high', 0)),
-                'Low': float(candle.get('low', 0)),
-                'Close': float(candle.get('close', 0)),
-                'Volume': int(candle.get('volume', 0)),
-                'Date': candle.get('time', '')
-            })
-        
-        df = pd.DataFrame(data)
-        if not df.empty:
-            df['Date'] = pd.to_datetime(df['Date'])
-            df.set_index('Date', inplace=True)
-        
-        return df
+        if isinstance(candles, np.ndarray):
+            # Колонки берутся из полей структурированного массива без разбора строк
+            return pd.DataFrame(
+                {
+                    'Open': candles['open'],
+                    'High': candles['high'],
+                    'Low': candles['low'],
+                    'Close': candles['close'],
+                    'Volume': candles['volume'],
+                },
+                index=pd.DatetimeIndex(candles['time'], name='Date').tz_localize('UTC')
+            )
+        
+        n = len(candles)
+        open_ = np.empty(n, dtype=np.float64)
+        high = np.empty(n, dtype=np.float64)
+        low = np.empty(n, dtype=np.float64)
+        close = np.empty(n, dtype=np.float64)
+        volume = np.empty(n, dtype=np.float64)
+        times = [None] * n
+        
+        # Один проход по свечам прямо в предвыделенные колонки
+        for i, candle in enumerate(candles):
+            open_[i] = candle['open']
+            high[i] = candle['high']
+            low[i] = candle['low']
+            close[i] = candle['close']
+            volume[i] = candle['volume']
+            times[i] = candle['time']
+        
+        # Строки ISO 8601 разбираются одним векторным вызовом
+        index = pd.DatetimeIndex(pd.to_datetime(times, utc=True), name='Date')
+        
+        return pd.DataFrame(
+            {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+            index=index
+        )
     
-    def _trading_cycle(self):
+    async def _trading_cycle(self):
         """Один цикл торговли"""
-        logger.info(f"--- Альфа торговый цикл {datetime.now().strftime('%H:%M:%S')} ---")
+        logger.info("--- Альфа торговый цикл {} ---", datetime.now().strftime('%H:%M:%S'))
         
-        # Получаем текущую цену через брокера
-        current_price = self.broker.get_current_price(self.symbol)
+        # Цена, свечи и портфель независимы, поэтому запрашиваются параллельно
+        current_price, recent_candles, portfolio = await asyncio.gather(
+            self.broker.get_current_price_async(self.symbol),
+            self._update_candles(),
+            self.broker.get_portfolio_async()
+        )
         
         if current_price is None:
             logger.warning("Не удалось получить текущую цену")
             return
         
-        # Получаем исторические данные для предсказания
-        recent_candles = self.broker.get_candles(self.symbol, interval='1day', days=90)
-        
         if not recent_candles:
             logger.warning("Не удалось получить данные для предсказания")
             return
         
-        recent_data = self._convert_candles_to_dataframe(recent_candles)
-        
-        # Делаем предсказание
-        predicted_price = self.predictor.predict_price(recent_data)
+        # Делаем предсказание (пока свеча не изменилась, модель не вызываем)
+        predicted_price = self._predict(recent_candles[-1])
         
         if predicted_price is None:
             logger.warning("Не удалось получить предсказание цены")
             return
         
+        # Баланс берется из того же портфеля без отдельного запроса
+        state = self._portfolio_state(portfolio)
+        
         # Принимаем торговое решение
-        self._make_trading_decision(current_price, predicted_price)
+        if self._make_trading_decision(current_price, predicted_price, state):
+            # После сделки состояние счета изменилось
+            state = self._portfolio_state(await self.broker.get_portfolio_async())
         
         # Выводим статус
-        self._print_status(current_price, predicted_price)
+        self._print_status(current_price, predicted_price, state)
+    
+    async def _update_candles(self) -> List[Dict]:
+        """
+        Догрузка свечей, появившихся после последней закэшированной
+        
+        Последняя свеча запрашивается повторно: пока бар не закрыт,
+        его цены меняются. Признаки считаются инкрементально, поэтому
+        предсказанию нужна только последняя свеча из кэша.
+        """
+        since = self._candle_cache_last_ts or datetime.now(timezone.utc) - timedelta(days=5)
+        new_candles = await self.broker.get_candles_since_async(self.symbol, '1day', since)
+        
+        if new_candles:
+            new_times = {candle['time'] for candle in new_candles}
+            cached = [candle for candle in self._candle_cache if candle['time'] not in new_times]
+            self._candle_cache = (cached + new_candles)[-CANDLE_CACHE_SIZE:]
+            self._candle_cache_last_ts = datetime.fromisoformat(
+                self._candle_cache[-1]['time'].replace('Z', '+00:00')
+            )
+        
+        return self._candle_cache
+    
+    def _portfolio_state(self, portfolio: Optional[Dict]) -> PortfolioState:
+        """Баланс и позиции по тикерам из ответа портфеля"""
+        positions = {p.get('ticker'): p for p in (portfolio or {}).get('positions', [])}
+        return PortfolioState(balance=self.broker.get_balance(portfolio), positions=positions)
+    
+    def _predict(self, candle: Dict[str, Any]) -> Optional[float]:
+        """Предсказание по свече с кэшем на время, пока свеча не обновится"""
+        key = (candle.get('time'), candle.get('close'), candle.get('volume'))
+        
+        if self._pred_cache is not None and self._pred_cache[0] == key:
+            return self._pred_cache[1]
+        
+        predicted_price = self.predictor.predict_next(candle)
+        if predicted_price is not None:
+            self._pred_cache = (key, predicted_price)
+        
+        return predicted_price
     
-    def _make_trading_decision(self, current_price: float, predicted_price: float):
-        """Принятие торгового решения"""
+    def _make_trading_decision(self, current_price: float, predicted_price: float,
+                               state: PortfolioState) -> bool:
+        """Принятие торгового решения (True, если сделка выполнена)"""
         price_change_percent = (predicted_price - current_price) / current_price
         
-        logger.info(f"Ожидаемое изменение цены: {price_change_percent:.2%}")
+        logger.info("Ожидаемое изменение цены: {:.2%}", price_change_percent)
+        
+        signal = decide(current_price, predicted_price, self.prediction_threshold)
         
         # Решение о покупке
-        if price_change_percent > self.prediction_threshold:
-            self._buy_signal(current_price, price_change_percent)
+        if signal == BUY:
+            return self._buy_signal(current_price, price_change_percent, state)
         
         # Решение о продаже
-        elif price_change_percent < -self.prediction_threshold:
-            self._sell_signal(current_price, price_change_percent)
+        elif signal == SELL:
+            return self._sell_signal(current_price, price_change_percent, state)
         
         else:
             logger.info("Удерживаем позицию (изменение цены незначительно)")
+            return False
     
-    def _buy_signal(self, current_price: float, expected_change: float):
+    def _buy_signal(self, current_price: float, expected_change: float, state: PortfolioState) -> bool:
         """Обработка сигнала на покупку"""
         # Проверяем текущие позиции
-        portfolio = self.broker.get_portfolio()
-        current_position = 0
-        
-        if portfolio:
-            for position in portfolio.get('positions', []):
-                if position.get('ticker') == self.symbol:
-                    current_position = int(position.get('balance', 0))
-                    break
+        current_position = state.quantity(self.symbol)
         
         if current_position > 0:
-            logger.info(f"Уже есть позиция: {current_position} акций {self.symbol}")
-            return
+            logger.info("Уже есть позиция: {} акций {}", current_position, self.symbol)
+            return False
         
         # Рассчитываем размер позиции
-        balance = self.broker.get_balance()
+        balance = state.balance
         if not balance:
             logger.warning("Не удалось получить баланс")
-            return
+            return False
         
         max_investment = balance * self.max_position_size
         quantity = int(max_investment / current_price)
         
         if quantity > 0:
-            logger.info(f"Попытка покупки {quantity} акций {self.symbol}")
+            logger.info("Попытка покупки {} акций {}", quantity, self.symbol)
             
             # Размещаем ордер через брокера
             order_result = self.broker.buy_market(self.symbol, quantity)
@@ -224,29 +340,26 @@ class AlfaTradingBot:
                 self.trade_history.append(trade)
                 self.positions[self.symbol] = self.positions.get(self.symbol, 0) + quantity
                 
-                logger.info(f"ПОКУПКА ВЫПОЛНЕНА: {quantity} акций {self.symbol} по ~{current_price:.2f}")
-            else:
-                logger.error("Не удалось выполнить покупку")
+                logger.info("ПОКУПКА ВЫПОЛНЕНА: {} акций {} по ~{:.2f}",
+                            quantity, self.symbol, current_price)
+                return True
+            
+            logger.error("Не удалось выполнить покупку")
         else:
             logger.warning("Недостаточно средств для покупки")
+        
+        return False
     
-    def _sell_signal(self, current_price: float, expected_change: float):
+    def _sell_signal(self, current_price: float, expected_change: float, state: PortfolioState) -> bool:
         """Обработка сигнала на продажу"""
         # Проверяем текущие позиции
-        portfolio = self.broker.get_portfolio()
-        current_position = 0
-        
-        if portfolio:
-            for position in portfolio.get('positions', []):
-                if position.get('ticker') == self.symbol:
-                    current_position = int(position.get('balance', 0))
-                    break
+        current_position = state.quantity(self.symbol)
         
         if current_position <= 0:
             logger.info("Нет позиции для продажи")
-            return
+            return False
         
-        logger.info(f"Попытка продажи {current_position} акций {self.symbol}")
+        logger.info("Попытка продажи {} акций {}", current_position, self.symbol)
         
         # Размещаем ордер на продажу
         order_result = self.broker.sell_market(self.symbol, current_position)
@@ -265,30 +378,29 @@ class AlfaTradingBot:
             self.trade_history.append(trade)
             self.positions[self.symbol] = 0
             
-            logger.info(f"ПРОДАЖА ВЫПОЛНЕНА: {current_position} акций {self.symbol} по ~{current_price:.2f}")
-        else:
-            logger.error("Не удалось выполнить продажу")
+            logger.info("ПРОДАЖА ВЫПОЛНЕНА: {} акций {} по ~{:.2f}",
+                        current_position, self.symbol, current_price)
+            return True
+        
+        logger.error("Не удалось выполнить продажу")
+        return False
     
-    def _print_status(self, current_price: float, predicted_price: float):
+    def _print_status(self, current_price: float, predicted_price: float, state: PortfolioState):
         """Вывод текущего статуса"""
-        balance = self.broker.get_balance()
-        portfolio = self.broker.get_portfolio()
-        
-        position_quantity = 0
-        if portfolio:
-            for position in portfolio.get('positions', []):
-                if position.get('ticker') == self.symbol:
-                    position_quantity = int(position.get('balance', 0))
-                    break
+        balance = state.balance
+        position_quantity = state.quantity(self.symbol)
         
         position_value = position_quantity * current_price
         total_value = (balance or 0) + position_value
         
-        logger.info(f"Баланс: {balance:,.2f} RUB" if balance else "Баланс: N/A")
-        logger.info(f"Позиция: {position_quantity} акций ({position_value:,.2f} RUB)")
-        logger.info(f"Общая стоимость: {total_value:,.2f} RUB")
-        logger.info(f"Текущая цена {self.symbol}: {current_price:.2f} RUB")
-        logger.info(f"Предсказанная цена: {predicted_price:.2f} RUB")
+        if balance:
+            logger.info("Баланс: {:,.2f} RUB", balance)
+        else:
+            logger.info("Баланс: N/A")
+        logger.info("Позиция: {} акций ({:,.2f} RUB)", position_quantity, position_value)
+        logger.info("Общая стоимость: {:,.2f} RUB", total_value)
+        logger.info("Текущая цена {}: {:.2f} RUB", self.symbol, current_price)
+        logger.info("Предсказанная цена: {:.2f} RUB", predicted_price)
     
     def stop(self):
         """Остановка бота"""
@@ -301,15 +413,16 @@ class AlfaTradingBot:
     def _print_final_stats(self):
         """Вывод финальной статистики"""
         logger.info("=== ФИНАЛЬНАЯ СТАТИСТИКА АЛЬФА-БОТА ===")
-        logger.info(f"Всего сделок: {len(self.trade_history)}")
+        logger.info("Всего сделок: {}", self.trade_history.total)
+        logger.info("Денежный поток по сделкам: {:,.2f} RUB", self.trade_history.cash_flow())
         
         balance = self.broker.get_balance()
         if balance:
-            logger.info(f"Финальный баланс: {balance:,.2f} RUB")
+            logger.info("Финальный баланс: {:,.2f} RUB", balance)
         
         if self.trade_history:
             logger.info("Последние сделки:")
-            for trade in self.trade_history[-5:]:
-                logger.info(f"{trade['timestamp'].strftime('%H:%M:%S')} - "
-                          f"{trade['action']} {trade['quantity']} {trade['symbol']} "
-                          f"по ~{trade['price']:.2f} RUB")
\ No newline at end of file
+            for trade in self.trade_history.recent(5):
+                logger.info("{} - {} {} {} по ~{:.2f} RUB",
+                            trade['timestamp'].strftime('%H:%M:%S'), trade['action'],
+                            trade['quantity'], trade['symbol'], trade['price'])
\ No newline at end of file
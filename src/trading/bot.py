@@ -2,15 +2,22 @@
 Основной модуль торгового бота
 """
 
+import os
 import time
 from typing import Dict, Any, Optional
 from loguru import logger
 from datetime import datetime
 
+from .trade_history import TradeHistory
+from .signals import decide, BUY, SELL
+
 
 class TradingBot:
     """Основной класс торгового бота"""
     
+    # Источник данных обучения: входит в имя файла сохраненной модели
+    DATA_SOURCE = 'yfinance'
+    
     def __init__(self, data_provider, predictor, config):
         """Инициализация бота"""
         self.data_provider = data_provider
@@ -18,17 +25,17 @@ class TradingBot:
         self.config = config
         
         # Состояние бота
-        self.balance = config.get('INITIAL_BALANCE', 10000.0)
+        self.balance = config.USD_INITIAL_BALANCE
         self.positions = {}  # {symbol: quantity}
-        self.trade_history = []
+        self.trade_history = TradeHistory(config.TRADE_HISTORY_MAX)
         self.is_running = False
         
         # Настройки торговли
-        self.symbol = config.get('DEFAULT_SYMBOL', 'AAPL')
-        self.max_position_size = config.get('MAX_POSITION_SIZE', 0.1)
+        self.symbol = config.DEFAULT_SYMBOL
+        self.max_position_size = config.MAX_POSITION_SIZE
         self.prediction_threshold = 0.02  # 2% минимальное изменение для торговли
         
-        logger.info(f"Бот инициализирован. Баланс: ${self.balance}")
+        logger.info("Бот инициализирован. Баланс: ${}", self.balance)
     
     def run(self):
         """Запуск основного цикла бота"""
@@ -50,11 +57,17 @@ class TradingBot:
                 logger.info("Получен сигнал остановки")
                 self.stop()
             except Exception as e:
-                logger.error(f"Ошибка в торговом цикле: {e}")
+                logger.error("Ошибка в торговом цикле: {}", e)
                 time.sleep(30)  # Пауза при ошибке
     
     def _train_model(self) -> bool:
-        """Обучение модели предсказания"""
+        """Обучение модели предсказания (или загрузка недавно обученной)"""
+        model_path = os.path.join(self.config.MODEL_DIR, f"{self.symbol}_{self.DATA_SOURCE}.pkl")
+        max_age = self.config.MODEL_CACHE_TTL_HOURS * 3600
+        
+        if self.predictor.load(model_path, max_age=max_age):
+            return True
+        
         logger.info("Обучение модели...")
         
         # Получаем исторические данные
@@ -68,11 +81,15 @@ class TradingBot:
             return False
         
         # Обучаем модель
-        return self.predictor.train_model(historical_data)
+        if not self.predictor.train_model(historical_data):
+            return False
+        
+        self.predictor.save(model_path)
+        return True
     
     def _trading_cycle(self):
         """Один цикл торговли"""
-        logger.info(f"--- Торговый цикл {datetime.now().strftime('%H:%M:%S')} ---")
+        logger.info("--- Торговый цикл {} ---", datetime.now().strftime('%H:%M:%S'))
         
         # Получаем текущие данные
         current_price = self.data_provider.get_current_price(self.symbol)
@@ -109,14 +126,16 @@ class TradingBot:
         """Принятие торгового решения"""
         price_change_percent = (predicted_price - current_price) / current_price
         
-        logger.info(f"Ожидаемое изменение цены: {price_change_percent:.2%}")
+        logger.info("Ожидаемое изменение цены: {:.2%}", price_change_percent)
+        
+        signal = decide(current_price, predicted_price, self.prediction_threshold)
         
         # Решение о покупке
-        if price_change_percent > self.prediction_threshold:
+        if signal == BUY:
             self._buy_signal(current_price, price_change_percent)
         
         # Решение о продаже
-        elif price_change_percent < -self.prediction_threshold:
+        elif signal == SELL:
             self._sell_signal(current_price, price_change_percent)
         
         else:
@@ -148,7 +167,7 @@ class TradingBot:
             }
             
             self.trade_history.append(trade)
-            logger.info(f"ПОКУПКА: {quantity} акций {self.symbol} по ${current_price:.2f}")
+            logger.info("ПОКУПКА: {} акций {} по ${:.2f}", quantity, self.symbol, current_price)
         else:
             logger.warning("Недостаточно средств для покупки")
     
@@ -174,18 +193,18 @@ class TradingBot:
         }
         
         self.trade_history.append(trade)
-        logger.info(f"ПРОДАЖА: {quantity} акций {self.symbol} по ${current_price:.2f}")
+        logger.info("ПРОДАЖА: {} акций {} по ${:.2f}", quantity, self.symbol, current_price)
     
     def _print_status(self, current_price: float, previous_price: float, predicted_price: float):
         """Вывод текущего статуса"""
         position_value = self.positions.get(self.symbol, 0) * current_price
         total_value = self.balance + position_value
         
-        logger.info(f"Баланс: ${self.balance:.2f}")
-        logger.info(f"Позиция: {self.positions.get(self.symbol, 0)} акций (${position_value:.2f})")
-        logger.info(f"Общая стоимость: ${total_value:.2f}")
-        logger.info(f"Текущая цена: ${current_price:.2f}")
-        logger.info(f"Предсказанная цена: ${predicted_price:.2f}")
+        logger.info("Баланс: ${:.2f}", self.balance)
+        logger.info("Позиция: {} акций (${:.2f})", self.positions.get(self.symbol, 0), position_value)
+        logger.info("Общая стоимость: ${:.2f}", total_value)
+        logger.info("Текущая цена: ${:.2f}", current_price)
+        logger.info("Предсказанная цена: ${:.2f}", predicted_price)
     
     def stop(self):
         """Остановка бота"""
@@ -198,12 +217,13 @@ class TradingBot:
     def _print_final_stats(self):
         """Вывод финальной статистики"""
         logger.info("=== ФИНАЛЬНАЯ СТАТИСТИКА ===")
-        logger.info(f"Всего сделок: {len(self.trade_history)}")
-        logger.info(f"Финальный баланс: ${self.balance:.2f}")
+        logger.info("Всего сделок: {}", self.trade_history.total)
+        logger.info("Денежный поток по сделкам: ${:.2f}", self.trade_history.cash_flow())
+        logger.info("Финальный баланс: ${:.2f}", self.balance)
         
         if self.trade_history:
             logger.info("Последние сделки:")
-            for trade in self.trade_history[-5:]:
-                logger.info(f"{trade['timestamp'].strftime('%H:%M:%S')} - "
-                          f"{trade['action']} {trade['quantity']} {trade['symbol']} "
-                          f"по ${trade['price']:.2f}")
\ No newline at end of file
+            for trade in self.trade_history.recent(5):
+                logger.info("{} - {} {} {} по ${:.2f}",
+                            trade['timestamp'].strftime('%H:%M:%S'), trade['action'],
+                            trade['quantity'], trade['symbol'], trade['price'])
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""
+Торговые сигналы по предсказанной цене
+"""
+
+from ..utils._njit import njit
+
+
+BUY = 1
+SELL = -1
+HOLD = 0
+
+
+@njit(cache=True)
+def decide(current: float, predicted: float, threshold: float) -> int:
+    """Сигнал по ожидаемому изменению цены: BUY, SELL или HOLD"""
+    change = (predicted - current) / current
+    if change > threshold:
+        return BUY
+    elif change < -threshold:
+        return SELL
+    return HOLD
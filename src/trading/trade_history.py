@@ -0,0 +1,48 @@
+"""
+Ограниченная история сделок торгового бота
+"""
+
+from collections import deque
+from typing import Dict, Any, List
+
+import numpy as np
+
+
+class TradeHistory:
+    """
+    История сделок фиксированного размера
+
+    Последние max_size сделок хранятся словарями для вывода, а цены и
+    количества дублируются в кольцевые массивы NumPy, чтобы агрегаты
+    считались векторно. Память не растет со временем работы бота.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        """Инициализация истории"""
+        self.max_size = max_size
+        self.total = 0  # Всего сделок за время работы
+        self._trades = deque(maxlen=max_size)
+        self._prices = np.empty(max_size, dtype=np.float64)
+        self._quantities = np.empty(max_size, dtype=np.int64)  # Покупка > 0, продажа < 0
+
+    def append(self, trade: Dict[str, Any]) -> None:
+        """Добавить сделку"""
+        i = self.total % self.max_size
+        self._prices[i] = trade['price']
+        self._quantities[i] = trade['quantity'] if trade['action'] == 'BUY' else -trade['quantity']
+        self._trades.append(trade)
+        self.total += 1
+
+    def recent(self, n: int = 5) -> List[Dict[str, Any]]:
+        """Последние n сделок"""
+        start = max(len(self._trades) - n, 0)
+        return [self._trades[i] for i in range(start, len(self._trades))]
+
+    def cash_flow(self) -> float:
+        """Денежный поток по хранимым сделкам (выручка от продаж минус затраты на покупки)"""
+        count = min(self.total, self.max_size)
+        return float(-np.dot(self._prices[:count], self._quantities[:count]))
+
+    def __len__(self) -> int:
+        """Количество хранимых сделок"""
+        return len(self._trades)
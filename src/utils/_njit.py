@@ -0,0 +1,19 @@
+"""
+Декоратор njit с откатом на чистый Python, если Numba не установлена
+"""
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - зависит от окружения
+    def njit(*args, **kwargs):
+        """Заглушка numba.njit: возвращает функцию без компиляции"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        
+        def decorator(func):
+            return func
+        
+        return decorator
+
+
+__all__ = ['njit']
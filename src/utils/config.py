@@ -3,49 +3,80 @@
 """
 
 import os
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable
 from dotenv import load_dotenv
 
 
+# Файл .env читается один раз при импорте модуля
+load_dotenv()
+
+
+def _env(name: str, default: str, cast: Callable[[str], Any] = str) -> Any:
+    """Поле конфигурации со значением из переменной окружения"""
+    return field(default_factory=lambda: cast(os.getenv(name, default)))
+
+
+def _flag(value: str) -> bool:
+    """Булево значение переменной окружения"""
+    return value.lower() == 'true'
+
+
+@dataclass
 class Config:
-    """Класс для управления конфигурацией приложения"""
-    
-    def __init__(self):
-        """Инициализация конфигурации"""
-        load_dotenv()
-        self._config = self._load_default_config()
-        
-    def _load_default_config(self) -> Dict[str, Any]:
-        """Загрузка конфигурации по умолчанию"""
-        return {
-            # API ключи
-            'ALPHA_VANTAGE_API_KEY': os.getenv('ALPHA_VANTAGE_API_KEY', ''),
-            'ALFA_TOKEN': os.getenv('ALFA_TOKEN', ''),
-            'ALFA_ACCOUNT_ID': os.getenv('ALFA_ACCOUNT_ID', ''),
-            
-            # Настройки торговли
-            'DEFAULT_SYMBOL': os.getenv('DEFAULT_SYMBOL', 'SBER'),  # Сбербанк для российского рынка
-            'INITIAL_BALANCE': float(os.getenv('INITIAL_BALANCE', '100000')),  # 100k рублей
-            'MAX_POSITION_SIZE': float(os.getenv('MAX_POSITION_SIZE', '0.1')),
-            'USE_ALFA_BROKER': os.getenv('USE_ALFA_BROKER', 'true').lower() == 'true',
-            
-            # Настройки модели
-            'PREDICTION_WINDOW': int(os.getenv('PREDICTION_WINDOW', '30')),
-            'TRAINING_PERIOD': int(os.getenv('TRAINING_PERIOD', '252')),
-            
-            # Настройки логирования
-            'LOG_LEVEL': os.getenv('LOG_LEVEL', 'INFO'),
-            'LOG_FILE': os.getenv('LOG_FILE', 'logs/trading_bot.log'),
-        }
-    
+    """
+    Класс для управления конфигурацией приложения
+
+    Значения читаются из окружения один раз при создании и доступны
+    атрибутами (config.MAX_POSITION_SIZE); get/set/get_all сохранены
+    для кода, который обращается к настройкам по имени.
+    """
+
+    # API ключи
+    ALPHA_VANTAGE_API_KEY: str = _env('ALPHA_VANTAGE_API_KEY', '')
+    ALFA_TOKEN: str = _env('ALFA_TOKEN', '')
+    ALFA_ACCOUNT_ID: str = _env('ALFA_ACCOUNT_ID', '')
+
+    # Настройки торговли
+    DEFAULT_SYMBOL: str = _env('DEFAULT_SYMBOL', 'SBER')  # Сбербанк для российского рынка
+    # Начальные балансы раздельны: бот Альфа-Инвестиций торгует в рублях,
+    # симуляция на Yahoo Finance — в долларах
+    ALFA_INITIAL_BALANCE: float = _env('ALFA_INITIAL_BALANCE', '100000', float)  # 100k рублей
+    USD_INITIAL_BALANCE: float = _env('USD_INITIAL_BALANCE', '10000', float)  # 10k долларов
+    MAX_POSITION_SIZE: float = _env('MAX_POSITION_SIZE', '0.1', float)
+    USE_ALFA_BROKER: bool = _env('USE_ALFA_BROKER', 'true', _flag)
+    TRADE_HISTORY_MAX: int = _env('TRADE_HISTORY_MAX', '10000', int)
+
+    # Кэш исторических данных
+    DATA_CACHE_DIR: str = _env('DATA_CACHE_DIR', '~/.tardebot_cache')
+    DATA_CACHE_TTL: int = _env('DATA_CACHE_TTL', '3600', int)  # секунды
+    # Полная перезагрузка кэша (догрузка хвоста не учитывает пересчет цен)
+    DATA_CACHE_REFRESH: int = _env('DATA_CACHE_REFRESH', '86400', int)  # секунды
+    PRICE_CACHE_TTL: int = _env('PRICE_CACHE_TTL', '60', int)  # секунды
+
+    # Настройки модели
+    PREDICTION_WINDOW: int = _env('PREDICTION_WINDOW', '30', int)
+    TRAINING_PERIOD: int = _env('TRAINING_PERIOD', '252', int)
+    MODEL_DIR: str = _env('MODEL_DIR', 'models')
+    MODEL_CACHE_TTL_HOURS: float = _env('MODEL_CACHE_TTL_HOURS', '24', float)
+
+    # Настройки логирования
+    LOG_LEVEL: str = _env('LOG_LEVEL', 'INFO')
+    LOG_FILE: str = _env('LOG_FILE', 'logs/trading_bot.log')
+
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """Создать конфигурацию из переменных окружения"""
+        return cls()
+
     def get(self, key: str, default: Any = None) -> Any:
         """Получить значение конфигурации"""
-        return self._config.get(key, default)
-    
+        return getattr(self, key, default)
+
     def set(self, key: str, value: Any) -> None:
         """Установить значение конфигурации"""
-        self._config[key] = value
-    
+        setattr(self, key, value)
+
     def get_all(self) -> Dict[str, Any]:
         """Получить всю конфигурацию"""
-        return self._config.copy()
\ No newline at end of file
+        return dict(vars(self))
@@ -3,9 +3,196 @@
 """
 
 import os
+import sys
+import atexit
+import functools
+import threading
+import zipfile
 from loguru import logger
 from typing import Optional
 
+try:
+    import zstandard  # noqa: F401
+    _HAS_ZSTD = True
+except ImportError:
+    # Без zstandard ротированные логи сжимаются в zip
+    _HAS_ZSTD = False
+
+
+# Формат консоли: подробный цветной для отладки и короткий без разметки
+# для остальных уровней (цветовые теги не разбираются на каждой записи)
+_CONSOLE_DEBUG_FMT = ("<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+                      "<level>{level: <8}</level> | "
+                      "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+                      "<level>{message}</level>")
+_CONSOLE_FMT = "{time:HH:mm:ss} {level} {message}"
+
+# Параметры последнего вызова setup_logger (повторная настройка пропускается)
+_SETUP_FINGERPRINT = None
+
+# Идентификаторы обработчиков, добавленных setup_logger
+_HANDLER_IDS = []
+
+# Размер буфера файла логов: по умолчанию loguru сбрасывает файл после
+# каждой строки, с буфером запись идет блоками (хвост до 64 КБ может
+# потеряться только при аварийном завершении процесса)
+LOG_BUFFER_SIZE = 65536
+
+# Записи этого уровня и выше сбрасываются на диск сразу вместе с буфером
+FLUSH_LEVEL_NO = logger.level("WARNING").no
+
+# Шаблоны строки файла логов. Время подставляется из кэша через
+# record["extra"], остальные поля loguru заполняет сам: значения полей
+# (например, функция "<module>") не разбираются как цветовая разметка.
+# Место вызова (модуль, функция, строка) пишется только в режиме отладки
+_FILE_DEBUG_FMT = "{extra[_time]} | {level: <8} | {name}:{function}:{line} - {message}\n{exception}"
+_FILE_FMT = "{extra[_time]} | {level: <8} | {message}\n{exception}"
+
+
+# Последняя отформатированная секунда: (секунда epoch, строка времени).
+# Кортеж заменяется целиком, поэтому чтение из разных потоков безопасно
+_time_cache = (None, "")
+
+
+def _format_time(moment) -> str:
+    """Время записи с точностью до секунды (strftime один раз в секунду)"""
+    global _time_cache
+    
+    second = int(moment.timestamp())
+    cached_second, cached_text = _time_cache
+    if second == cached_second:
+        return cached_text
+    
+    text = moment.strftime("%Y-%m-%d %H:%M:%S")
+    _time_cache = (second, text)
+    return text
+
+
+def _file_debug_formatter(record: dict) -> str:
+    """Формат строки файла логов для отладки (с местом вызова)"""
+    record["extra"]["_time"] = _format_time(record["time"])
+    return _FILE_DEBUG_FMT
+
+
+def _file_formatter(record: dict) -> str:
+    """Формат строки файла логов без места вызова (уровни INFO и выше)"""
+    record["extra"]["_time"] = _format_time(record["time"])
+    return _FILE_FMT
+
+
+# Потоки сжатия ротированных логов (дожидаемся их перед выходом)
+_COMPRESSION_THREADS = []
+
+
+def _zip_and_remove(path: str) -> None:
+    """Сжатие ротированного файла логов в zip и удаление исходного файла"""
+    temp_path = path + '.zip.tmp'
+    try:
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, os.path.basename(path))
+        # Архив появляется под своим именем только целиком
+        os.replace(temp_path, path + '.zip')
+        os.remove(path)
+    except Exception as e:
+        logger.warning("Не удалось сжать файл логов {}: {}", path, e)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _zstd_and_remove(path: str) -> None:
+    """Сжатие ротированного файла логов в zstd (все ядра) и удаление исходного файла"""
+    import zstandard as zstd
+    
+    temp_path = path + '.zst.tmp'
+    try:
+        compressor = zstd.ZstdCompressor(level=3, threads=-1)
+        with open(path, 'rb') as source, open(temp_path, 'wb') as target:
+            compressor.copy_stream(source, target)
+        # Архив появляется под своим именем только целиком
+        os.replace(temp_path, path + '.zst')
+        os.remove(path)
+    except Exception as e:
+        logger.warning("Не удалось сжать файл логов {}: {}", path, e)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _compress_in_background(path: str) -> None:
+    """Сжатие после ротации в отдельном потоке, чтобы не задерживать запись логов"""
+    target = _zstd_and_remove if _HAS_ZSTD else _zip_and_remove
+    thread = threading.Thread(target=target, args=(path,))
+    
+    _COMPRESSION_THREADS[:] = [t for t in _COMPRESSION_THREADS if t.is_alive()]
+    _COMPRESSION_THREADS.append(thread)
+    thread.start()
+
+
+def _wait_for_compression() -> None:
+    """Дождаться сжатия ротированных логов перед выходом"""
+    for thread in list(_COMPRESSION_THREADS):
+        thread.join()
+
+
+# Обработчики atexit выполняются в обратном порядке: сначала logger.complete
+# дописывает очередь (enqueue=True) и может ротировать файл, затем
+# дожидаемся запущенного при этом сжатия
+atexit.register(_wait_for_compression)
+atexit.register(logger.complete)
+
+
+# Единицы размера для параметра rotation ("10 MB")
+_SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+# Через сколько записей оценка размера файла сверяется с file.tell()
+# (tell сбрасывает буфер файла, поэтому не на каждой записи)
+ROTATION_CHECK_EVERY = 100
+
+
+def _parse_size(value: str) -> Optional[int]:
+    """Размер в байтах из строки вида "10 MB" (None, если это не размер)"""
+    parts = value.split()
+    if len(parts) != 2 or parts[1].upper() not in _SIZE_UNITS:
+        return None
+    
+    try:
+        return int(float(parts[0]) * _SIZE_UNITS[parts[1].upper()])
+    except ValueError:
+        return None
+
+
+def _size_rotator(max_bytes: int, check_every: int = ROTATION_CHECK_EVERY):
+    """
+    Ротация по размеру без stat() на каждую запись
+    
+    Размер файла оценивается счетчиком записанных символов и раз в
+    check_every записей уточняется по позиции в файле.
+    
+    Функция ротации вызывается перед записью каждого сообщения и получает
+    открытый файл, поэтому здесь же включается построчный сброс для
+    WARNING и выше: такая строка попадает на диск вместе с буфером.
+    """
+    state = {'size': None, 'calls': 0}
+    
+    def should_rotate(message, file) -> bool:
+        # reconfigure сбрасывает буфер, поэтому вызывается только при смене режима
+        urgent = message.record["level"].no >= FLUSH_LEVEL_NO
+        if file.line_buffering != urgent:
+            file.reconfigure(line_buffering=urgent)
+        
+        state['calls'] += 1
+        if state['size'] is None or state['calls'] % check_every == 0:
+            state['size'] = file.tell()
+        
+        if state['size'] + len(message) > max_bytes:
+            # Сообщение будет записано уже в новый файл
+            state['size'] = len(message)
+            return True
+        
+        state['size'] += len(message)
+        return False
+    
+    return should_rotate
+
 
 def setup_logger(
     log_level: str = "INFO",
@@ -21,51 +208,110 @@ def setup_logger(
         log_file: Путь к файлу логов (если None, логи только в консоль)
         rotation: Размер файла для ротации
         retention: Время хранения старых логов
+    
+    Запись, ротация и сжатие выполняются в фоновом потоке loguru
+    (enqueue=True), но сообщение формируется в вызывающем потоке:
+    в горячих участках не стоит строить дорогие f-строки для DEBUG.
+    
+    Файл пишется через буфер; при ротации по размеру записи уровня
+    WARNING и выше сбрасываются на диск сразу.
+    
+    Повторный вызов с теми же параметрами ничего не делает. Чтобы снять
+    обработчики, используйте reset_logger, а не logger.remove(): после
+    него setup_logger настроит логирование заново.
     """
+    global _SETUP_FINGERPRINT
+    
+    # Повторный вызов с теми же параметрами не пересоздает обработчики
+    fingerprint = (log_level, log_file, rotation, retention)
+    if fingerprint == _SETUP_FINGERPRINT:
+        return
+    
+    # Уровень разрешается в число один раз для обоих обработчиков
+    level_no = logger.level(log_level.upper()).no
     
     # Удаляем стандартный обработчик
     logger.remove()
+    _HANDLER_IDS.clear()
     
-    # Добавляем консольный обработчик
-    logger.add(
-        sink=lambda msg: print(msg, end=""),
-        level=log_level,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-               "<level>{level: <8}</level> | "
-               "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
-               "<level>{message}</level>",
-        colorize=True
-    )
+    # Добавляем консольный обработчик (поток пишется напрямую, без print)
+    debug = level_no <= logger.level("DEBUG").no
+    _HANDLER_IDS.append(logger.add(
+        sink=sys.stderr,
+        level=level_no,
+        format=_CONSOLE_DEBUG_FMT if debug else _CONSOLE_FMT,
+        colorize=debug,
+        enqueue=True,
+        catch=False
+    ))
     
     # Добавляем файловый обработчик, если указан путь
     if log_file:
         # Создаем директорию для логов, если её нет
         log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        
+        # Ротация по размеру считается без stat(); по времени — средствами loguru
+        max_bytes = _parse_size(rotation)
         
-        logger.add(
+        _HANDLER_IDS.append(logger.add(
             sink=log_file,
-            level=log_level,
-            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-            rotation=rotation,
+            level=level_no,
+            format=_file_debug_formatter if debug else _file_formatter,
+            rotation=_size_rotator(max_bytes) if max_bytes else rotation,
             retention=retention,
-            compression="zip"
-        )
+            compression=_compress_in_background,
+            enqueue=True,
+            buffering=LOG_BUFFER_SIZE,
+            catch=False
+        ))
         
-        logger.info(f"Логирование настроено. Файл: {log_file}")
+        logger.info("Логирование настроено. Файл: {}", log_file)
     else:
         logger.info("Логирование настроено (только консоль)")
+    
+    _SETUP_FINGERPRINT = fingerprint
+
+
+def reset_logger() -> None:
+    """
+    Снять обработчики, добавленные setup_logger
+    
+    Очередь и буфер файла дописываются на диск. Следующий вызов
+    setup_logger настроит логирование заново даже с прежними параметрами.
+    """
+    global _SETUP_FINGERPRINT
+    
+    for handler_id in _HANDLER_IDS:
+        try:
+            logger.remove(handler_id)
+        except ValueError:
+            # Обработчик уже удален напрямую через logger.remove()
+            pass
+    
+    _HANDLER_IDS.clear()
+    _SETUP_FINGERPRINT = None
 
 
+@functools.lru_cache(maxsize=None)
 def get_logger(name: str):
     """
     Получить логгер с указанным именем
     
+    Для одного имени возвращается один и тот же объект: привязанные
+    логгеры неизменяемы, поэтому их можно разделять между вызовами.
+    Дорогие аргументы передаются функциями через opt(lazy=True) и
+    вычисляются, только если уровень сообщения проходит фильтр.
+    
+        log = get_logger(__name__)
+        log.info("v={}", 5)
+        log.opt(lazy=True).debug("big={}", lambda: repr(big_obj))
+    
     Args:
         name: Имя логгера
         
     Returns:
         Настроенный логгер
     """
-    return logger.bind(name=name)
\ No newline at end of file
+    return logger.bind(name=name)
@@ -0,0 +1,30 @@
+"""
+Общие фикстуры тестов
+"""
+
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from tardebot.utils.config import Config
+
+
+@pytest.fixture(scope="session")
+def real_config():
+    """
+    Одна настоящая конфигурация на всю сессию тестов
+    
+    Создается при пустом окружении, чтобы переменные из .env
+    разработчика не подменяли значения по умолчанию.
+    """
+    with patch.dict(os.environ, clear=True):
+        return Config()
+
+
+@pytest.fixture(scope="module")
+def stub_config():
+    """Легкая заглушка конфигурации для тестов, которым не нужны реальные значения"""
+    stub = MagicMock(spec=Config)
+    stub.get.side_effect = lambda key, default=None: default
+    return stub
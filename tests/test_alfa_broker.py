@@ -0,0 +1,84 @@
+"""
+Тесты повторов запросов к API Альфа-Инвестиций
+"""
+
+import asyncio
+
+import pytest
+
+from tardebot.brokers import alfa_broker
+from tardebot.brokers.alfa_broker import AlfaBroker
+
+
+class FakeResponse:
+    """Ответ HTTP с кодом статуса и заголовками"""
+    
+    def __init__(self, status_code, headers=None, content=b'{"ok": true}'):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+        self.text = content.decode()
+
+
+class FakeClient:
+    """Асинхронный клиент, отдающий ответы по очереди"""
+    
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+    
+    async def post(self, endpoint, json=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def broker(stub_config, monkeypatch):
+    """Брокер без реальных пауз между повторами"""
+    sleeps = []
+    monkeypatch.setattr(alfa_broker.time, "sleep", sleeps.append)
+    
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+    monkeypatch.setattr(alfa_broker.asyncio, "sleep", fake_sleep)
+    
+    instance = AlfaBroker(stub_config)
+    instance.sleeps = sleeps
+    return instance
+
+
+def test_post_retried_after_rate_limit(broker):
+    """POST повторяется после 429 с паузой из Retry-After, ограниченной сверху"""
+    responses = [FakeResponse(429, {'Retry-After': '120'}), FakeResponse(200)]
+    calls = []
+    
+    def fake_post(url, **kwargs):
+        calls.append(url)
+        return responses.pop(0)
+    broker._verbs['POST'] = (fake_post, 'json')
+    
+    assert broker._make_request('POST', '/orders') == {'ok': True}
+    assert len(calls) == 2
+    assert broker.sleeps == [alfa_broker.MAX_RETRY_WAIT]
+
+
+def test_post_not_retried_after_server_error(broker):
+    """5xx для POST не повторяется: сервер мог выполнить запрос"""
+    calls = []
+    
+    def fake_post(url, **kwargs):
+        calls.append(url)
+        return FakeResponse(503)
+    broker._verbs['POST'] = (fake_post, 'json')
+    
+    assert broker._make_request('POST', '/orders') is None
+    assert len(calls) == 1
+
+
+def test_async_post_retried_after_rate_limit(broker):
+    """Асинхронный POST повторяется после 429 ограниченное число раз"""
+    client = FakeClient([FakeResponse(429)] * (alfa_broker.RETRY_TOTAL + 1))
+    broker._aclient = client
+    
+    assert asyncio.run(broker._amake_request('POST', '/orders')) is None
+    assert client.calls == alfa_broker.RETRY_TOTAL + 1
@@ -0,0 +1,29 @@
+"""
+Тесты кэша моделей торгового бота Альфа-Инвестиций
+"""
+
+from dataclasses import replace
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from tardebot.trading.alfa_trading_bot import AlfaTradingBot
+
+
+def test_fallback_trained_model_saved_under_fallback_source(real_config, tmp_path):
+    """Модель, обученная на данных Yahoo Finance, не сохраняется как модель брокера"""
+    config = replace(real_config, MODEL_DIR=str(tmp_path))
+    data_provider = MagicMock()
+    data_provider.get_historical_data.return_value = pd.DataFrame({'Close': [1.0, 2.0]})
+    predictor = MagicMock()
+    predictor.load.return_value = False
+    predictor.train_model.return_value = True
+    
+    bot = AlfaTradingBot(data_provider, predictor, config)
+    bot.broker.get_candles_arr = MagicMock(return_value=None)
+    
+    assert bot._train_model()
+    
+    saved_path = predictor.save.call_args[0][0]
+    assert saved_path.endswith(f"{config.DEFAULT_SYMBOL}_yfinance.pkl")
+    assert predictor.load.call_args[0][0].endswith(f"{config.DEFAULT_SYMBOL}_alfa.pkl")
@@ -2,42 +2,33 @@
 Базовые тесты для проверки работы модулей
 """
 
-import sys
-import os
 import pytest
 
-# Добавляем путь к модулям проекта
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-
-from utils.config import Config
-from data.stock_data import StockDataProvider
-from models.price_predictor import PricePredictor
-
-
-def test_config_initialization():
-    """Тест инициализации конфигурации"""
-    config = Config()
-    assert config is not None
-    assert config.get('INITIAL_BALANCE') == 10000.0
-    assert config.get('DEFAULT_SYMBOL') == 'AAPL'
-
-
-def test_stock_data_provider_initialization():
-    """Тест инициализации провайдера данных"""
-    config = Config()
-    provider = StockDataProvider(config)
-    assert provider is not None
-    assert provider.config == config
-
-
-def test_price_predictor_initialization():
-    """Тест инициализации предиктора цен"""
-    config = Config()
-    predictor = PricePredictor(config)
-    assert predictor is not None
-    assert predictor.config == config
-    assert predictor.is_trained == False
+from tardebot.data.stock_data import StockDataProvider
+from tardebot.models.price_predictor import PricePredictor
+
+
+@pytest.mark.parametrize("config_fixture, factory, checks", [
+    ('real_config', lambda c: c, {
+        'ALFA_INITIAL_BALANCE': 100000.0,
+        'USD_INITIAL_BALANCE': 10000.0,
+        'DEFAULT_SYMBOL': 'SBER',
+    }),
+    ('stub_config', StockDataProvider, {}),
+    ('stub_config', PricePredictor, {'is_trained': False}),
+], ids=['config', 'stock_data_provider', 'price_predictor'])
+def test_initialization(request, config_fixture, factory, checks):
+    """Тест инициализации конфигурации, провайдера данных и предиктора цен"""
+    config = request.getfixturevalue(config_fixture)
+    component = factory(config)
+    assert component is not None
+    
+    if component is not config:
+        assert component.config == config
+    
+    for attr, expected in checks.items():
+        assert getattr(component, attr) == expected
 
 
 if __name__ == "__main__":
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])
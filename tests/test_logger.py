@@ -0,0 +1,88 @@
+"""
+Тесты настройки логирования
+"""
+
+import pytest
+from loguru import logger
+
+from tardebot.utils import logger as logger_module
+from tardebot.utils.logger import get_logger, reset_logger, setup_logger
+
+
+@pytest.fixture
+def debug_log_file(tmp_path):
+    """Файл логов, настроенный setup_logger на уровне DEBUG"""
+    path = tmp_path / "bot.log"
+    setup_logger("DEBUG", str(path))
+    yield path
+    
+    reset_logger()
+
+
+def test_get_logger_formats_plain_arguments():
+    """Логгер по имени принимает обычные (не вызываемые) аргументы"""
+    messages = []
+    log = get_logger("tests")
+    
+    handler_id = logger.add(messages.append, format="{message}")
+    try:
+        log.info("v={}", 5)
+    finally:
+        logger.remove(handler_id)
+    
+    assert messages == ["v=5\n"]
+
+
+def test_file_log_from_module_level(debug_log_file):
+    """Имена функций вида <module> и <listcomp> не разбираются как разметка"""
+    code = "logger.info('module level')\n[logger.info('comprehension') for _ in range(1)]"
+    exec(compile(code, "<test>", "exec"), {'logger': logger})
+    
+    # Удаление обработчиков дописывает очередь и буфер файла
+    reset_logger()
+    text = debug_log_file.read_text(encoding="utf-8")
+    
+    assert ":<module>:1 - module level" in text
+    assert "- comprehension" in text
+
+
+def test_rotated_log_compressed_completely(tmp_path):
+    """Сжатие дожидается завершения и не оставляет временных файлов"""
+    path = tmp_path / "bot.2024-01-01.log"
+    path.write_text("line\n" * 10_000, encoding="utf-8")
+    
+    logger_module._compress_in_background(str(path))
+    assert not any(t.daemon for t in logger_module._COMPRESSION_THREADS)
+    logger_module._wait_for_compression()
+    
+    assert [p.suffix for p in tmp_path.iterdir()] in (['.zip'], ['.zst'])
+
+
+def test_warning_flushed_to_file(tmp_path):
+    """Предупреждение попадает на диск сразу вместе с буфером INFO"""
+    path = tmp_path / "bot.log"
+    setup_logger("INFO", str(path))
+    try:
+        logger.info("buffered info")
+        logger.warning("urgent warning")
+        logger.complete()
+        
+        text = path.read_text(encoding="utf-8")
+        assert "buffered info" in text
+        assert "urgent warning" in text
+    finally:
+        reset_logger()
+
+
+def test_setup_after_reset_adds_handlers_again(tmp_path):
+    """После reset_logger повторная настройка с теми же параметрами не пропускается"""
+    path = tmp_path / "bot.log"
+    try:
+        setup_logger("INFO", str(path))
+        reset_logger()
+        setup_logger("INFO", str(path))
+        logger.warning("after reset")
+    finally:
+        reset_logger()
+    
+    assert "after reset" in path.read_text(encoding="utf-8")
@@ -0,0 +1,95 @@
+"""
+Тесты инкрементального расчета признаков предиктора цен
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tardebot.models.price_predictor import PricePredictor
+
+
+@pytest.fixture(scope="module")
+def history():
+    """Дневные свечи OHLCV с индексом по UTC, как у yfinance"""
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, 60))
+    index = pd.date_range("2024-01-01", periods=60, freq="D", tz="UTC")
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, 60),
+        'High': close + 1.0,
+        'Low': close - 1.0,
+        'Close': close,
+        'Volume': rng.integers(1_000, 5_000, 60).astype(float),
+    }, index=index)
+
+
+def _candle(data, i):
+    """Свеча брокера для строки i с наивным временем ISO 8601 (UTC)"""
+    row = data.iloc[i]
+    return {
+        'time': data.index[i].tz_localize(None).isoformat(),
+        'open': row['Open'],
+        'high': row['High'],
+        'low': row['Low'],
+        'close': row['Close'],
+        'volume': row['Volume'],
+    }
+
+
+@pytest.mark.parametrize("repeats", [1, 3])
+def test_update_one_matches_prepare_features(stub_config, history, repeats):
+    """Признаки нового бара совпадают с последней строкой prepare_features"""
+    predictor = PricePredictor(stub_config)
+    features, _ = predictor.prepare_features(history)
+    assert predictor.init_state(history.iloc[:-1])
+    
+    # Повторные обновления того же бара не сдвигают окна
+    for _ in range(repeats):
+        row = predictor.update_one(_candle(history, -1))
+    
+    np.testing.assert_allclose(row[0], features[-1], rtol=1e-5)
+
+
+def test_update_one_same_bar_keeps_state(stub_config, history):
+    """Обновление незакрытого бара с наивным временем его не фиксирует"""
+    predictor = PricePredictor(stub_config)
+    features, _ = predictor.prepare_features(history)
+    assert predictor.init_state(history)
+    
+    row = predictor.update_one(_candle(history, -1))
+    
+    np.testing.assert_allclose(row[0], features[-1], rtol=1e-5)
+
+
+def test_load_rejects_other_feature_layout(stub_config, tmp_path):
+    """Модель, сохраненная с другим набором признаков, не загружается"""
+    import joblib
+    
+    path = str(tmp_path / "model.pkl")
+    joblib.dump({'model': None, 'feature_cols': ['Open', 'High', 'Low']}, path)
+    
+    predictor = PricePredictor(stub_config)
+    assert not predictor.load(path)
+    assert not predictor.is_trained
+
+
+def test_onnx_model_predicts_without_lightgbm(stub_config, history, tmp_path):
+    """Экспортированная ONNX модель работает без LightGBM и сбрасывается при переобучении"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnxmltools")
+    
+    trained = PricePredictor(stub_config)
+    assert trained.train_model(history)
+    expected = trained.predict_price(history)
+    
+    path = str(tmp_path / "model.onnx")
+    assert trained.export_onnx(path)
+    
+    onnx_only = PricePredictor(stub_config)
+    assert onnx_only.load_onnx(path)
+    assert onnx_only.predict_price(history) == pytest.approx(expected, rel=1e-4)
+    
+    # Переобучение заменяет модель, старая сессия ONNX не используется
+    assert onnx_only.train_model(history)
+    assert onnx_only._session is None
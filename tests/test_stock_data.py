@@ -0,0 +1,96 @@
+"""
+Тесты дискового кэша исторических данных
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tardebot.data.stock_data import StockDataProvider
+
+
+def _history(periods, scale=1.0):
+    """Дневные свечи OHLCV (scale имитирует пересчет цен после сплита)"""
+    index = pd.date_range("2024-01-01", periods=periods, freq="D", tz="UTC")
+    close = np.linspace(100, 100 + periods, periods) * scale
+    return pd.DataFrame({
+        'Open': close, 'High': close + 1, 'Low': close - 1,
+        'Close': close, 'Volume': np.full(periods, 1000.0),
+    }, index=index)
+
+
+class FakeTicker:
+    """yf.Ticker с заранее заданными ответами history()"""
+    
+    def __init__(self, full, tail):
+        self.full = full
+        self.tail = tail
+        self.calls = []
+    
+    def history(self, period=None, start=None, interval=None):
+        self.calls.append('full' if start is None else 'tail')
+        return self.full if start is None else self.tail
+
+
+@pytest.fixture
+def provider(stub_config, tmp_path):
+    """Провайдер с кэшем во временном каталоге и истекшим TTL"""
+    data_provider = StockDataProvider(stub_config)
+    data_provider.cache_dir = str(tmp_path)
+    data_provider.cache_ttl = 0
+    return data_provider
+
+
+def _fetch(provider, monkeypatch, ticker):
+    """Загрузка истории через подмененный yf.Ticker"""
+    import yfinance
+    monkeypatch.setattr(yfinance, "Ticker", lambda symbol: ticker)
+    return provider.get_historical_data("TEST", period="1y")
+
+
+def test_stale_cache_appends_tail(provider, monkeypatch):
+    """Без пересчета цен к кэшу догружается только хвост"""
+    _fetch(provider, monkeypatch, FakeTicker(_history(32).iloc[:30], None))
+    
+    ticker = FakeTicker(None, _history(32).iloc[29:])
+    data = _fetch(provider, monkeypatch, ticker)
+    
+    assert ticker.calls == ['tail']
+    assert len(data) == 32
+
+
+def test_adjusted_overlap_refetches_full_period(provider, monkeypatch):
+    """Изменившаяся цена общей свечи (сплит) приводит к полной загрузке"""
+    _fetch(provider, monkeypatch, FakeTicker(_history(32).iloc[:30], None))
+    
+    full = _history(32, scale=0.5)
+    ticker = FakeTicker(full, full.iloc[29:])
+    data = _fetch(provider, monkeypatch, ticker)
+    
+    assert ticker.calls == ['tail', 'full']
+    np.testing.assert_allclose(data['Close'].to_numpy(), full['Close'].to_numpy(), rtol=1e-6)
+
+
+def test_old_full_fetch_refetches_full_period(provider, monkeypatch):
+    """После DATA_CACHE_REFRESH кэш загружается целиком"""
+    _fetch(provider, monkeypatch, FakeTicker(_history(30), None))
+    marker = provider._cache_path("TEST", "1y") + '.full'
+    os.utime(marker, (0, 0))
+    
+    ticker = FakeTicker(_history(31), None)
+    _fetch(provider, monkeypatch, ticker)
+    
+    assert ticker.calls == ['full']
+
+
+def test_current_and_previous_price_share_one_request(provider, monkeypatch):
+    """Текущая и предыдущая цена берутся из одной загрузки двух свечей"""
+    import yfinance
+    ticker = FakeTicker(_history(2), None)
+    monkeypatch.setattr(yfinance, "Ticker", lambda symbol: ticker)
+    
+    assert provider.get_current_price("TEST") == pytest.approx(102.0)
+    assert provider.get_previous_price("TEST") == pytest.approx(100.0)
+    assert ticker.calls == ['full']